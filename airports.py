@@ -0,0 +1,224 @@
+"""
+Airport and metro-area index.
+
+The bundled airports.csv (or AIRPORTS_FILE, same columns) lists airports
+and metro areas. A metro row (e.g. LON) groups the airports whose metro
+column points at it; codes like SHA exist both as a metro and as one of
+its airports, which is also how Amadeus treats them.
+
+On first use the CSV is compiled into two sorted numpy arrays in
+AIRPORT_INDEX_DIR and memory-mapped from there afterwards:
+  entries  one record per row, sorted by code
+  keys     (search key, entry) pairs sorted by key, where keys are the
+           code, city, name and each of their words, lowercased
+Prefix search is two binary searches over the keys. File names carry a
+hash of the CSV's path, size and mtime (plus the layout version), so a
+different or edited CSV never reuses another's index.
+"""
+
+import csv
+import glob
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+AIRPORTS_FILE = os.getenv('AIRPORTS_FILE') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "airports.csv")
+AIRPORT_INDEX_DIR = os.getenv('AIRPORT_INDEX_DIR') or os.path.join(
+    tempfile.gettempdir(), "flight_tracker_airports")
+
+KEY_BYTES = 32
+# Bumped whenever the array layout changes so old index files are ignored
+INDEX_VERSION = 1
+
+ENTRY_DTYPE = np.dtype([
+    ('code', 'U3'), ('type', 'U7'), ('name', 'U64'),
+    ('city', 'U32'), ('country', 'U2'), ('metro', 'U3'),
+    ('city_key', f'S{KEY_BYTES}'),
+])
+KEY_DTYPE = np.dtype([('key', f'S{KEY_BYTES}'), ('entry', '<u4')])
+IATA_RE = re.compile(r'^[A-Z]{3}$')
+
+
+def is_iata_code(code: str) -> bool:
+    """Well-formed three-letter airport or city code (upper-case)"""
+    return bool(IATA_RE.match(code))
+
+
+def normalize(text: str) -> bytes:
+    """Lowercase ASCII form used for keys and queries ('São' -> b'sao')"""
+    folded = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore')
+    return folded.lower().strip()[:KEY_BYTES]
+
+
+def _search_terms(row: Dict[str, str]) -> Iterable[bytes]:
+    yield normalize(row['code'])
+    for field in ('city', 'name'):
+        yield normalize(row[field])
+        for word in row[field].replace('-', ' ').replace('/', ' ').split():
+            if len(word) > 1:
+                yield normalize(word)
+
+
+def _index_paths(csv_path: str, index_dir: str) -> List[str]:
+    """entries/keys file names for this exact CSV: <name>.<path hash>-<version hash>.npy"""
+    csv_path = os.path.abspath(csv_path)
+    stat = os.stat(csv_path)
+    path_tag = hashlib.sha1(csv_path.encode()).hexdigest()[:10]
+    version_tag = hashlib.sha1(
+        f"{stat.st_size}:{stat.st_mtime_ns}:{INDEX_VERSION}".encode()).hexdigest()[:10]
+    return [os.path.join(index_dir, f"{name}.{path_tag}-{version_tag}.npy")
+            for name in ('entries', 'keys')]
+
+
+def build_index(csv_path: str, index_dir: Optional[str] = None):
+    """Compile the CSV into (entries, keys) arrays, saving them if index_dir is given"""
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = sorted(csv.DictReader(f), key=lambda r: (r['code'], r['type'] != 'metro'))
+
+    entries = np.array([
+        tuple(row[name] or '' for name in ENTRY_DTYPE.names[:-1]) + (normalize(row['city']),)
+        for row in rows
+    ], dtype=ENTRY_DTYPE)
+    keys = np.array(sorted({
+        (term, idx) for idx, row in enumerate(rows) for term in _search_terms(row) if term
+    }), dtype=KEY_DTYPE)
+
+    if index_dir:
+        os.makedirs(index_dir, exist_ok=True)
+        paths = _index_paths(csv_path, index_dir)
+        for path, array in zip(paths, (entries, keys)):
+            with open(path + ".tmp", 'wb') as f:
+                np.save(f, array)
+            os.replace(path + ".tmp", path)
+        # Drop indexes of earlier versions of the same CSV
+        path_tag = os.path.basename(paths[0]).split('.')[1].split('-')[0]
+        for old in glob.glob(os.path.join(index_dir, f"*.{path_tag}-*.npy")):
+            if old not in paths:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+    return entries, keys
+
+
+class AirportIndex:
+    """Read-only view over the entry and key arrays."""
+
+    def __init__(self, entries: np.ndarray, keys: np.ndarray):
+        self.entries = entries
+        self.keys = keys
+
+    @classmethod
+    def load(cls, csv_path: str = AIRPORTS_FILE,
+             index_dir: str = AIRPORT_INDEX_DIR) -> "AirportIndex":
+        """Memory-map the prebuilt index for this CSV, building it if missing"""
+        paths = _index_paths(csv_path, index_dir)
+        if all(os.path.exists(p) for p in paths):
+            try:
+                return cls(*(np.load(p, mmap_mode='r') for p in paths))
+            except (OSError, ValueError) as exc:
+                logging.warning("Airport index unreadable, rebuilding: %s", exc)
+        try:
+            build_index(csv_path, index_dir)
+            return cls(*(np.load(p, mmap_mode='r') for p in paths))
+        except OSError as exc:
+            # Read-only filesystem: keep the index in memory only
+            logging.warning("Could not write airport index to %s: %s", index_dir, exc)
+            return cls(*build_index(csv_path))
+
+    def _record(self, idx: int) -> Dict[str, Any]:
+        entry = self.entries[idx]
+        record = {name: str(entry[name]) for name in ENTRY_DTYPE.names[:-1]}
+        record['metro'] = record['metro'] or None
+        if record['type'] == 'metro':
+            record['airports'] = self.metro_members(record['code'])
+        return record
+
+    def _code_range(self, code: str) -> range:
+        codes = self.entries['code']
+        return range(int(np.searchsorted(codes, code, 'left')),
+                     int(np.searchsorted(codes, code, 'right')))
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Airports and metros whose code, city or name starts with query"""
+        # One byte short of the key width so the upper bound still fits
+        prefix = normalize(query)[:KEY_BYTES - 1]
+        if not prefix:
+            return []
+        column = self.keys['key']
+        lo = int(np.searchsorted(column, prefix, 'left'))
+        hi = int(np.searchsorted(column, prefix + b'\xff', 'left'))
+        matches = np.unique(self.keys['entry'][lo:hi])
+        if not len(matches):
+            return []
+
+        # Exact code, then city prefix, then metros before airports, then city name
+        found = self.entries[matches]
+        order = np.lexsort((
+            matches,
+            found['city'],
+            found['type'] != 'metro',
+            ~np.char.startswith(found['city_key'], prefix),
+            found['code'] != prefix.decode().upper(),
+        ))
+        return [self._record(int(idx)) for idx in matches[order[:limit]]]
+
+    def lookup(self, code: str) -> List[Dict[str, Any]]:
+        """All entries for an exact code (a metro first, then its airport)"""
+        return [self._record(idx) for idx in self._code_range(code.upper())]
+
+    def is_known(self, code: str) -> bool:
+        return len(self._code_range(code.upper())) > 0
+
+    def metro_of(self, code: str) -> str:
+        """Metro code an airport belongs to (the code itself if it is a metro or standalone)"""
+        code = code.upper()
+        for idx in self._code_range(code):
+            entry = self.entries[idx]
+            if entry['type'] == 'metro':
+                return code
+            if entry['metro']:
+                return str(entry['metro'])
+        return code
+
+    def metro_members(self, code: str) -> List[str]:
+        """Airports in a metro area, empty if code is not a metro"""
+        members = self.entries['code'][self.entries['metro'] == code.upper()]
+        return [str(member) for member in members]
+
+
+_index: Optional[AirportIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> AirportIndex:
+    """Process-wide airport index, loaded on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = AirportIndex.load()
+    return _index
+
+
+def expand_codes(codes: Iterable[str], metros: bool = True) -> List[str]:
+    """Upper-case, de-duplicated codes, with metro codes replaced by their airports"""
+    index = get_index()
+    expanded = []
+    for code in codes:
+        code = code.strip().upper()
+        expanded.extend((metros and index.metro_members(code)) or [code])
+    return list(dict.fromkeys(expanded))
+
+
+def same_metro(origin: str, destination: str) -> bool:
+    """True for routes that don't leave the metro area (SHA->PVG, LHR->LGW, JFK->JFK)"""
+    index = get_index()
+    return index.metro_of(origin) == index.metro_of(destination)
@@ -0,0 +1,289 @@
+"""
+Connection reuse for the Amadeus SDK.
+
+The SDK defaults to ``urlopen`` (one TLS handshake per call) and keeps its
+OAuth token on the client instance (one token exchange per client). This
+module provides a keep-alive transport that plugs into ``Client(http=...)``
+and an expiry-aware token cache in SQLite shared by every process that
+points at the same file.
+"""
+
+import http.client
+import logging
+import os
+import sqlite3
+import ssl
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.error import URLError
+
+from amadeus import Client
+from amadeus.client.access_token import AccessToken
+
+# 'keepalive' (pooled connections) or 'urllib' (SDK default, new connection per call)
+HTTP_TRANSPORT = os.getenv('AMADEUS_HTTP_TRANSPORT', 'keepalive').lower()
+# Defaults to the app's data directory (the /app/data volume in Docker);
+# an empty string disables the shared cache (tokens stay per client)
+TOKEN_CACHE_PATH = os.getenv(
+    'AMADEUS_TOKEN_CACHE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "amadeus_tokens.db"),
+)
+
+
+# ─── Keep-alive transport ──────────────────────────────────────────────────
+class _PooledResponse:
+    """Fully-read response handed back to the SDK parser.
+
+    The body is read eagerly so the connection can go back to the pool
+    before the SDK gets around to parsing.
+    """
+
+    def __init__(self, response: http.client.HTTPResponse):
+        self.status = response.status
+        self.code = response.status
+        self.reason = response.reason
+        self.headers = response.msg
+        self._body = response.read()
+
+    def read(self) -> bytes:
+        return self._body
+
+    def info(self):
+        return self.headers
+
+    def getheaders(self) -> List[Tuple[str, str]]:
+        return list(self.headers.items())
+
+
+class KeepAliveTransport:
+    """``urlopen``-compatible callable with a per-host connection pool."""
+
+    # Errors meaning the server dropped an idle pooled connection
+    STALE_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError,
+                    ConnectionResetError, http.client.CannotSendRequest)
+
+    def __init__(self, timeout: float = 30, max_idle_per_host: int = 8,
+                 ssl_context: Optional[ssl.SSLContext] = None):
+        self.timeout = timeout
+        self.max_idle_per_host = max_idle_per_host
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self._idle: Dict[Tuple[str, str], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def __call__(self, request, timeout: Optional[float] = None):
+        key = (request.type, request.host)
+        headers = dict(request.header_items())
+        headers.setdefault('Connection', 'keep-alive')
+
+        for attempt in range(2):
+            conn, reused = self._acquire(key)
+            try:
+                conn.request(request.get_method(), request.selector,
+                             body=request.data, headers=headers)
+                response = _PooledResponse(conn.getresponse())
+            except self.STALE_ERRORS as exc:
+                conn.close()
+                # Retry once on a fresh connection if the pooled one went stale
+                if reused and attempt == 0:
+                    continue
+                raise URLError(exc)
+            except (OSError, http.client.HTTPException) as exc:
+                conn.close()
+                raise URLError(exc)
+
+            if response.headers.get('Connection', '').lower() == 'close':
+                conn.close()
+            else:
+                self._release(key, conn)
+            return response
+
+    def _acquire(self, key) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+            self.connections_opened += 1
+
+        scheme, host = key
+        if scheme == 'https':
+            conn = http.client.HTTPSConnection(host, timeout=self.timeout,
+                                               context=self.ssl_context)
+        else:
+            conn = http.client.HTTPConnection(host, timeout=self.timeout)
+        return conn, False
+
+    def _release(self, key, conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for idle in pools.values():
+            for conn in idle:
+                conn.close()
+
+
+# ─── Shared token cache ────────────────────────────────────────────────────
+class TokenCache:
+    """OAuth tokens in a SQLite file, keyed by API host and client id.
+
+    Refreshes run inside a write transaction, so when several processes
+    find the token expired only the first one hits the token endpoint and
+    the rest pick up its result.
+    """
+
+    def __init__(self, path: str = TOKEN_CACHE_PATH):
+        self.path = path
+        self._create_private_file()
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS oauth_tokens (
+                    cache_key TEXT PRIMARY KEY,
+                    access_token TEXT NOT NULL,
+                    expires_at INTEGER NOT NULL
+                )
+            """)
+
+    def _create_private_file(self):
+        """Create the cache owner-only (0600) and refuse one planted by another user"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        try:
+            os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600))
+        except FileExistsError:
+            # Windows has no uids; the file lives under the user's own data dir there
+            if hasattr(os, "getuid") and os.stat(self.path).st_uid != os.getuid():
+                raise PermissionError(f"{self.path} is owned by another user")
+
+    def get_or_refresh(self, cache_key: str, min_valid_until: int,
+                       fetch: Callable[[], Dict]) -> Tuple[str, int]:
+        """Return a token valid past min_valid_until, calling fetch() if needed"""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT access_token, expires_at FROM oauth_tokens WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+            if row and row[1] > min_valid_until:
+                conn.execute("COMMIT")
+                return row[0], row[1]
+
+            data = fetch()
+            token = data.get('access_token')
+            expires_at = int(time.time()) + int(data.get('expires_in', 0))
+            if token:
+                conn.execute("""
+                    INSERT OR REPLACE INTO oauth_tokens (cache_key, access_token, expires_at)
+                    VALUES (?, ?, ?)
+                """, (cache_key, token, expires_at))
+            conn.execute("COMMIT")
+            return token, expires_at
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def invalidate(self, cache_key: str):
+        with sqlite3.connect(self.path, timeout=30) as conn:
+            conn.execute("DELETE FROM oauth_tokens WHERE cache_key = ?", (cache_key,))
+
+
+class SharedAccessToken(AccessToken):
+    """Drop-in for the SDK's AccessToken that goes through a TokenCache."""
+
+    def __init__(self, client: Client, cache: TokenCache):
+        super().__init__(client)
+        self.cache = cache
+        self.cache_key = f"{client.host}|{client.client_id}"
+        self._lock = threading.Lock()
+
+    def _bearer_token(self):
+        return 'Bearer {0}'.format(self._shared_token())
+
+    def _shared_token(self) -> str:
+        with self._lock:
+            min_valid_until = int(time.time()) + self.TOKEN_BUFFER
+            if self.access_token is None or self.expires_at <= min_valid_until:
+                self.access_token, self.expires_at = self.cache.get_or_refresh(
+                    self.cache_key, min_valid_until, self._fetch_token)
+            return self.access_token
+
+    def _fetch_token(self) -> Dict:
+        logging.info("Requesting new Amadeus access token")
+        response = self.client._unauthenticated_request(
+            'POST',
+            '/v1/security/oauth2/token',
+            {
+                'grant_type': 'client_credentials',
+                'client_id': self.client.client_id,
+                'client_secret': self.client.client_secret,
+            },
+        )
+        return response.result or {}
+
+    def invalidate(self):
+        """Forget the token here and in the shared cache (e.g. after a 401)"""
+        with self._lock:
+            self.access_token = None
+            self.expires_at = 0
+            self.cache.invalidate(self.cache_key)
+
+
+# ─── Client factory ────────────────────────────────────────────────────────
+_shared_transport: Optional[KeepAliveTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_shared_transport() -> KeepAliveTransport:
+    """Process-wide keep-alive transport"""
+    global _shared_transport
+    with _transport_lock:
+        if _shared_transport is None:
+            _shared_transport = KeepAliveTransport()
+        return _shared_transport
+
+
+def create_client(client_id: str, client_secret: str,
+                  transport: Optional[Callable] = None,
+                  token_cache_path: Optional[str] = None,
+                  **options) -> Client:
+    """Build an Amadeus client using the configured transport and token cache."""
+    if transport is None and HTTP_TRANSPORT == 'keepalive':
+        transport = get_shared_transport()
+    if transport is not None:
+        options['http'] = transport
+
+    client = Client(client_id=client_id, client_secret=client_secret, **options)
+
+    cache_path = TOKEN_CACHE_PATH if token_cache_path is None else token_cache_path
+    if cache_path:
+        try:
+            cache = TokenCache(cache_path)
+        except (sqlite3.Error, OSError) as exc:
+            # Not fatal: the SDK keeps its own token on the client instead
+            logging.warning("Token cache %s unavailable, using per-client tokens: %s",
+                            cache_path, exc)
+        else:
+            # The SDK memoizes its AccessToken on this attribute
+            client.access_token = SharedAccessToken(client, cache)
+    return client
+
+
+def invalidate_token(client: Client):
+    """Drop a client's cached token so the next call re-authenticates"""
+    token = getattr(client, 'access_token', None)
+    if isinstance(token, SharedAccessToken):
+        token.invalidate()
+    elif token is not None:
+        del client.access_token
@@ -1,7 +1,13 @@
 import os
 from flask import Flask, render_template, jsonify, request, redirect, url_for, flash
+from werkzeug.middleware.proxy_fix import ProxyFix
 from database import FlightDatabase
-from flight_checker import run_flight_check
+import flight_checker
+from flight_checker import run_flight_check, FLIGHT_CONFIG, CLASS_MAP
+from itinerary_optimizer import FareMatrix, optimize
+from route_search import RouteSearchService, TooManyRequests
+from fx import convert_rows, convert_value, get_rate_table
+from airports import get_index as get_airport_index, is_iata_code, same_metro
 import threading
 import traceback
 from datetime import datetime
@@ -10,6 +16,12 @@ from datetime import datetime
 app = Flask(__name__)
 app.secret_key = 'flight-tracker-secret-key-change-in-production'
 
+# Number of reverse proxies in front of the app whose X-Forwarded-For may be
+# trusted; 0 (default) uses the socket peer address as the client address
+TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', '0'))
+if TRUSTED_PROXIES > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
 db = FlightDatabase()
 
 # Global search status
@@ -21,6 +33,44 @@ search_status = {
     'error': None
 }
 
+def _lookup_route(key):
+    """Upstream lookup for /api/search (one flight_offers_search call)
+
+    Always quoted in FLIGHT_CONFIG["currency"]; other currencies are
+    converted on read so they share the cached answer. Failed lookups
+    raise, so only a genuine "no offers" answer is cached.
+    """
+    origin, destination, dep_date, ret_date, travel_class, adults, currency = key
+    if not flight_checker.initialize_amadeus_client():
+        raise RuntimeError("Amadeus client unavailable")
+    price, segs = flight_checker.get_flight_offer_details(
+        origin, destination, dep_date, ret_date,
+        travel_class, adults, currency, 1, FLIGHT_CONFIG["non_stop"],
+        raise_errors=True,
+    )
+    return {
+        'price': price,
+        'segments': segs,
+        'fetched_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+route_search = RouteSearchService(_lookup_route)
+
+def _display_currency():
+    """Currency requested via ?currency= (None if there is no rate for it)"""
+    code = request.args.get('currency', FLIGHT_CONFIG["display_currency"]).strip().upper()
+    return code if get_rate_table().supports(code) else None
+
+def _convert_runs(runs, currency):
+    """Express job-run minimums (stored in the configured currency) in currency"""
+    return [
+        {**run, 'min_price': convert_value(run['min_price'], FLIGHT_CONFIG["currency"], currency)}
+        for run in runs
+    ]
+
+def _unknown_currency():
+    return jsonify({'error': f"currency must be one of {', '.join(get_rate_table().currencies())}"}), 400
+
 def run_search_background():
     """Run flight search in background thread"""
     global search_status
@@ -51,13 +101,18 @@ def run_search_background():
 def dashboard():
     """Main dashboard page"""
     try:
-        latest_results = db.get_latest_results()
-        job_runs = db.get_job_runs()
+        currency = _display_currency()
+        if currency is None:
+            return "Unknown currency", 400
+        latest_results = convert_rows(db.get_latest_results(), currency)
+        job_runs = _convert_runs(db.get_job_runs(), currency)
         
         return render_template('index.html', 
                              results=latest_results, 
                              job_runs=job_runs,
-                             search_status=search_status)
+                             search_status=search_status,
+                             display_currency=currency,
+                             currencies=get_rate_table().currencies())
     except Exception as e:
         print(f"❌ Dashboard error: {e}")
         return f"Dashboard Error: {e}", 500
@@ -91,15 +146,21 @@ def trigger_search():
 def search_history():
     """Search history page"""
     try:
-        all_runs = db.get_all_job_runs_with_details()
+        currency = _display_currency()
+        if currency is None:
+            return "Unknown currency", 400
+        all_runs = _convert_runs(db.get_all_job_runs_with_details(), currency)
         search_dates = db.get_search_dates()
         stats = db.get_search_statistics()
+        stats['best_price_ever'] = convert_value(stats['best_price_ever'],
+                                                 FLIGHT_CONFIG["currency"], currency)
         
         return render_template('history.html',
                              job_runs=all_runs,
                              search_dates=search_dates,
                              stats=stats,
-                             search_status=search_status)
+                             search_status=search_status,
+                             display_currency=currency)
     except Exception as e:
         print(f"History page error: {e}")
         return f"Error loading history: {e}", 500
@@ -108,11 +169,14 @@ def search_history():
 def search_details(search_date):
     """Show details for a specific search date"""
     try:
-        results = db.get_results_by_date(search_date)
+        currency = _display_currency()
+        if currency is None:
+            return "Unknown currency", 400
+        results = convert_rows(db.get_results_by_date(search_date), currency)
         job_run = None
         
         # Get job run info for this date
-        job_runs = db.get_job_runs()
+        job_runs = _convert_runs(db.get_job_runs(), currency)
         for run in job_runs:
             if run['run_date'] == search_date:
                 job_run = run
@@ -122,7 +186,8 @@ def search_details(search_date):
                              results=results,
                              job_run=job_run,
                              search_date=search_date,
-                             search_status=search_status)
+                             search_status=search_status,
+                             display_currency=currency)
     except Exception as e:
         print(f"Search details error: {e}")
         return f"Error loading search details: {e}", 500
@@ -135,19 +200,141 @@ def api_search_status():
 
 @app.route('/api/results')
 def api_results():
-    """API endpoint for latest results"""
-    return jsonify(db.get_latest_results())
+    """API endpoint for latest results (optional ?currency=)"""
+    currency = _display_currency()
+    if currency is None:
+        return _unknown_currency()
+    return jsonify(convert_rows(db.get_latest_results(), currency))
 
 @app.route('/api/history/<origin>/<destination>')
 def api_history(origin, destination):
-    """API endpoint for price history"""
-    return jsonify(db.get_price_history(origin, destination))
+    """API endpoint for price history (optional ?currency=)"""
+    currency = _display_currency()
+    if currency is None:
+        return _unknown_currency()
+    return jsonify(convert_rows(db.get_price_history(origin, destination), currency))
 
 @app.route('/api/job-runs')
 def api_job_runs():
     """API endpoint for job run history"""
     return jsonify(db.get_job_runs())
 
+def _airport_list(value, default):
+    """Parse a comma-separated airport list query parameter"""
+    if not value:
+        return list(default)
+    return [code.strip().upper() for code in value.split(',') if code.strip()]
+
+def _parse_date(value):
+    """datetime.date for a YYYY-MM-DD string, or None if it isn't a real date"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+@app.route('/api/search')
+def api_search():
+    """API endpoint for an on-demand single-route price lookup
+
+    Query parameters: origin, destination, date (YYYY-MM-DD), optional
+    return_date, adults, travel_class (E/W/B/F) and currency.
+    """
+    origin = request.args.get('origin', '').strip().upper()
+    destination = request.args.get('destination', '').strip().upper()
+    dep_date = request.args.get('date', '').strip()
+    ret_date = request.args.get('return_date', '').strip() or None
+    currency = _display_currency()
+    cabin = request.args.get('travel_class', FLIGHT_CONFIG["cabin_class"]).strip().upper()
+
+    if not (is_iata_code(origin) and is_iata_code(destination)) or origin == destination:
+        return jsonify({'error': 'origin and destination must be different IATA codes'}), 400
+    if same_metro(origin, destination):
+        # Same rule as the batch run: no quota spent on SHA->PVG
+        return jsonify({'error': 'origin and destination are in the same metro area'}), 400
+    departure = _parse_date(dep_date)
+    if departure is None or (ret_date and _parse_date(ret_date) is None):
+        return jsonify({'error': 'dates must be valid YYYY-MM-DD dates'}), 400
+    if departure < datetime.now().date():
+        return jsonify({'error': 'date must not be in the past'}), 400
+    if ret_date and _parse_date(ret_date) < departure:
+        return jsonify({'error': 'return_date must not be before date'}), 400
+    if cabin not in CLASS_MAP:
+        return jsonify({'error': f"travel_class must be one of {', '.join(CLASS_MAP)}"}), 400
+    if currency is None:
+        return _unknown_currency()
+    try:
+        adults = int(request.args.get('adults', FLIGHT_CONFIG["adults"]))
+    except ValueError:
+        return jsonify({'error': 'adults must be a number'}), 400
+    if not 1 <= adults <= 9:
+        return jsonify({'error': 'adults must be between 1 and 9'}), 400
+
+    key = (origin, destination, dep_date, ret_date, CLASS_MAP[cabin], adults,
+           FLIGHT_CONFIG["currency"])
+    # Only the socket peer (or what a configured ProxyFix derived) is trusted
+    client_id = request.remote_addr or 'unknown'
+    try:
+        result, source = route_search.search(key, client_id)
+    except TooManyRequests:
+        return jsonify({'error': 'Too many concurrent searches, retry shortly'}), 429
+    except Exception as e:
+        print(f"❌ On-demand search error: {e}")
+        return jsonify({'error': str(e)}), 503
+
+    if result['price'] is not None:
+        result = {**result, 'price': convert_rows(
+            [{'price': result['price'], 'currency': FLIGHT_CONFIG["currency"]}], currency)[0]['price']}
+
+    body = {
+        'origin': origin,
+        'destination': destination,
+        'departure_date': dep_date,
+        'return_date': ret_date,
+        'currency': currency,
+        'source': source,
+        **result,
+    }
+    if result['price'] is None:
+        return jsonify({**body, 'error': 'No offers found'}), 404
+    return jsonify(body)
+
+@app.route('/api/airports')
+def api_airports():
+    """API endpoint for airport / metro autocomplete
+
+    Query parameters: q (code, city or airport name prefix) and limit.
+    """
+    query = request.args.get('q', '').strip()
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    return jsonify(get_airport_index().search(query, limit))
+
+@app.route('/api/optimize')
+def api_optimize():
+    """API endpoint for best any-origin / open-jaw / multi-leg combinations
+
+    Query parameters: origins, destinations, returns (comma-separated),
+    path, e.g. path=SHA|NKG,YVR,SHA|NKG for a multi-leg chain of groups,
+    and currency.
+    """
+    currency = _display_currency()
+    if currency is None:
+        return _unknown_currency()
+    origins = _airport_list(request.args.get('origins'), FLIGHT_CONFIG["origins"])
+    destinations = _airport_list(request.args.get('destinations'), FLIGHT_CONFIG["destinations"])
+    returns = _airport_list(request.args.get('returns'), origins)
+    raw_path = request.args.get('path', '')
+    path = [_airport_list(group.replace('|', ','), []) for group in raw_path.split(',')]
+    if raw_path and (len(path) < 2 or not all(path)):
+        return jsonify({'error': 'path needs at least two non-empty airport groups'}), 400
+
+    fares = FareMatrix.from_rows(convert_rows(db.get_latest_results(), currency))
+    return jsonify({**optimize(fares, origins, destinations, returns, path or None,
+                               one_way=FLIGHT_CONFIG["trip_type"] != "W"),
+                    'currency': currency})
+
 
 if __name__ == '__main__':
     # 获取Zeabur提供的端口，默认5000
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Airport autocomplete latency.
+
+Builds the index for the bundled dataset and for a synthetic one the size
+of a full IATA list, then reports build time, memory-mapped load time and
+search latency percentiles over every 1-3 character prefix.
+
+    python benchmarks/bench_airports.py [--synthetic 9000]
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airports import AIRPORTS_FILE, AirportIndex
+
+
+def synthetic_csv(path, count):
+    rng = random.Random(11)
+    codes = rng.sample(["".join(c) for c in itertools.product(string.ascii_uppercase, repeat=3)], count)
+    words = ["International", "Regional", "Municipal", "Airfield", "City", "North", "Field"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["code", "type", "name", "city", "country", "metro"])
+        for code in codes:
+            city = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10))).title()
+            writer.writerow([code, "airport", f"{city} {rng.choice(words)}", city, "XX", ""])
+
+
+def measure(label, csv_path):
+    index_dir = tempfile.mkdtemp()
+    start = time.perf_counter()
+    AirportIndex.load(csv_path, index_dir)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    index = AirportIndex.load(csv_path, index_dir)
+    load = time.perf_counter() - start
+
+    prefixes = ["".join(p) for n in (1, 2, 3)
+                for p in itertools.product(string.ascii_lowercase, repeat=n)]
+    index.search("warm up")
+    latencies = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.search(prefix, 10)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    print(f"{label:10s} {len(index.entries):5d} entries {len(index.keys):6d} keys | "
+          f"build {build * 1000:6.1f} ms | mmap load {load * 1000:5.2f} ms | "
+          f"search p50 {statistics.median(latencies):5.0f} us "
+          f"p99 {latencies[int(len(latencies) * 0.99)]:5.0f} us "
+          f"max {latencies[-1]:5.0f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--synthetic", type=int, default=9000, help="synthetic airport count")
+    args = parser.parse_args()
+
+    measure("bundled", AIRPORTS_FILE)
+    path = os.path.join(tempfile.mkdtemp(), "airports.csv")
+    synthetic_csv(path, args.synthetic)
+    measure("synthetic", path)
+
+
+if __name__ == "__main__":
+    main()
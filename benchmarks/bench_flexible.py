@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+API calls and wall time of flexible-date search against the fake provider.
+
+Compares pricing every date pair with flight_offers_search (exhaustive)
+against the two-tier mode (one flight_dates pre-scan per route, then
+confirming the top K). Also reports how often two-tier lands on the same
+cheapest fare as the exhaustive search. flight_dates has no cabin
+parameter, so for a non-economy cabin its ranking is only a hint; the fake
+provider models that, which is where the overpay comes from.
+
+    python benchmarks/bench_flexible.py [--latency 0.02] [--top-k 1]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("AMADEUS_PROVIDER", "fake")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flight_checker
+from fake_provider import FakeAmadeusClient
+
+ORIGINS = ["SHA", "NKG", "PEK", "CAN"]
+DESTINATIONS = ["DXB", "YVR", "LHR", "SYD", "NRT"]
+
+
+def exhaustive(origin, destination, config):
+    """Price every departure/return pair with the precise endpoint"""
+    start = datetime.strptime(config["departure_date"], "%Y-%m-%d")
+    low, high = config["flex_duration_range"]
+    best = None
+    for offset in range(config["flex_departure_days"]):
+        dep = start + timedelta(days=offset)
+        for duration in range(low, high + 1):
+            ret = dep + timedelta(days=duration)
+            price, _ = flight_checker.get_flight_offer_details(
+                origin, destination, f"{dep:%Y-%m-%d}", f"{ret:%Y-%m-%d}",
+                flight_checker.CLASS_MAP[config["cabin_class"]], 1, config["currency"], 1, False,
+            )
+            if price is not None and (best is None or float(price) < best):
+                best = float(price)
+    return best
+
+
+def run(label, query, latency):
+    client = FakeAmadeusClient(latency=latency)
+    flight_checker.amadeus_client = client
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        prices = {(o, d): query(o, d) for o in ORIGINS for d in DESTINATIONS}
+    elapsed = time.perf_counter() - start
+    calls = sum(client.calls.values())
+    print(f"{label:12s} {calls:6d} calls ({dict(client.calls)}) {elapsed:7.2f} s")
+    return prices, calls, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency", type=float, default=0.02, help="fake per-call latency (s)")
+    parser.add_argument("--top-k", type=int, default=1)
+    args = parser.parse_args()
+
+    config = flight_checker.FLIGHT_CONFIG
+    config.update(search_mode="flexible", flex_confirm_top_k=args.top_k)
+    routes = len(ORIGINS) * len(DESTINATIONS)
+    pairs = config["flex_departure_days"] * (config["flex_duration_range"][1]
+                                             - config["flex_duration_range"][0] + 1)
+    print(f"{routes} routes x {pairs} date pairs, {args.latency * 1000:.0f} ms per call")
+
+    full, full_calls, full_time = run("exhaustive", lambda o, d: exhaustive(o, d, config),
+                                         args.latency)
+    two_tier, tier_calls, tier_time = run(
+        "two-tier", lambda o, d: float(flight_checker.query_route(o, d)[0]), args.latency)
+
+    same = sum(abs(full[r] - two_tier[r]) < 0.01 for r in full)
+    gaps = [(two_tier[r] - full[r]) / full[r] for r in full]
+    print(f"calls cut {full_calls / tier_calls:.1f}x, wall time cut {full_time / tier_time:.1f}x")
+    print(f"two-tier found the exhaustive cheapest on {same}/{routes} routes "
+          f"(mean overpay {sum(gaps) / len(gaps):.1%}, worst {max(gaps):.1%}, "
+          f"{flight_checker.CLASS_MAP[config['cabin_class']]})")
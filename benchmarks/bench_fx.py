@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Cost of showing the route matrix in several currencies.
+
+Compares re-querying the fake provider once per currency (the old way)
+with one query plus local conversion, and times vectorized conversion of
+a large result set against converting row by row.
+
+    python benchmarks/bench_fx.py [--rows 100000] [--currencies CNY,USD,EUR]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+os.environ["AMADEUS_PROVIDER"] = "fake"
+os.environ["AMADEUS_REQUEST_DELAY"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import flight_checker
+from fake_provider import FakeAmadeusClient
+from fx import CANONICAL_CURRENCY, convert_results, convert_rows, get_rate_table
+
+
+def matrix_calls(currencies, requery):
+    """Upstream calls needed to produce the matrix in every currency"""
+    flight_checker.amadeus_client = FakeAmadeusClient(latency=0)
+    origins, destinations = flight_checker.FLIGHT_CONFIG["origins"], flight_checker.FLIGHT_CONFIG["destinations"]
+    base = flight_checker.FLIGHT_CONFIG["currency"]
+
+    def run(currency):
+        flight_checker.FLIGHT_CONFIG["currency"] = currency
+        return {o: {d: flight_checker.query_route(o, d) for d in destinations} for o in origins}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        if requery:
+            for currency in currencies:
+                run(currency)
+        else:
+            results = run(base)
+            for currency in currencies:
+                convert_results(results, base, currency)
+    flight_checker.FLIGHT_CONFIG["currency"] = base
+    return sum(flight_checker.amadeus_client.calls.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--currencies", default="CNY,USD,EUR")
+    args = parser.parse_args()
+    currencies = args.currencies.split(",")
+
+    print(f"Matrix in {len(currencies)} currencies: "
+          f"re-query {matrix_calls(currencies, True)} calls | "
+          f"convert locally {matrix_calls(currencies, False)} calls")
+
+    rng = random.Random(7)
+    quoted = list(get_rate_table().rates)
+    rows = [{"price": f"{rng.uniform(500, 40000):.2f}", "currency": rng.choice(quoted),
+             "price_amount": rng.uniform(100, 5000)} for _ in range(args.rows)]
+
+    start = time.perf_counter()
+    convert_rows(rows, "USD")
+    vectorized = time.perf_counter() - start
+
+    table = get_rate_table()
+    start = time.perf_counter()
+    for row in rows:
+        dict(row, price=f"{table.convert(row['price_amount'], CANONICAL_CURRENCY, 'USD'):.2f}")
+    per_row = time.perf_counter() - start
+
+    print(f"{args.rows} rows -> USD: vectorized {vectorized * 1000:.0f} ms | "
+          f"row by row {per_row * 1000:.0f} ms | x{per_row / vectorized:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Timing of the itinerary optimizer on large airport matrices.
+
+Builds a random N x N one-way fare matrix (30% of routes unpriced) from
+database-shaped rows, then times each optimizer and checks open-jaw
+against a brute-force answer.
+
+    python benchmarks/bench_optimizer.py [--airports 500]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from itinerary_optimizer import (FareMatrix, best_any_origin, best_multi_leg,
+                                 best_open_jaw)
+
+
+def timed(label, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    print(f"{label:28s} {(time.perf_counter() - start) * 1000:8.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--airports", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    n = args.airports
+    codes = [f"X{i:03d}" for i in range(n)]
+    prices = rng.uniform(300, 20000, (n, n))
+    priced = rng.random((n, n)) >= 0.3
+    rows = [
+        {"origin": codes[i], "destination": codes[j], "price": f"{prices[i, j]:.2f}"}
+        for i, j in zip(*np.nonzero(priced)) if i != j
+    ]
+    print(f"{n} x {n} airports, {len(rows)} priced routes")
+
+    fares = timed("load rows into matrix", FareMatrix.from_rows, rows)
+    timed("any-origin", best_any_origin, fares, codes, codes)
+    open_jaw = timed("open-jaw (min-plus)", best_open_jaw, fares, codes, codes, codes)
+    timed("multi-leg (4 full groups)", best_multi_leg, fares, [codes] * 4)
+
+    brute = (fares.fares[:, :, None] + fares.fares[None, :, :]).min()
+    assert abs(open_jaw["price"] - brute) < 1e-6, (open_jaw["price"], brute)
+    print(f"open-jaw matches brute force: {open_jaw['price']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
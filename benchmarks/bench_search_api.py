@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Load test of /api/search against the fake provider.
+
+Fires hundreds of concurrent requests through the Flask test client and
+reports status codes, upstream call counts and latency for three bursts:
+identical requests from many clients, distinct routes from many clients,
+and one client bursting distinct routes.
+
+    python benchmarks/bench_search_api.py [--requests 300] [--latency 0.05]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+os.environ.setdefault("AMADEUS_PROVIDER", "fake")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# app opens flight_data.db in the working directory
+os.chdir(tempfile.mkdtemp())
+
+import app as web
+import flight_checker
+from fake_provider import FakeAmadeusClient
+from route_search import RouteSearchService
+
+AIRPORTS = ["SHA", "NKG", "PEK", "CAN", "DXB", "YVR", "LHR", "SYD", "NRT", "SIN",
+            "HKG", "ICN", "CDG", "FRA", "JFK", "LAX", "SFO", "BKK", "KUL", "MEL"]
+
+
+def burst(label, requests, latency):
+    """requests: list of (query_string, client_ip)"""
+    flight_checker.amadeus_client = FakeAmadeusClient(latency=latency)
+    web.route_search = RouteSearchService(web._lookup_route)
+    client = web.app.test_client()
+
+    def fire(req):
+        query, ip = req
+        start = time.perf_counter()
+        response = client.get(f"/api/search?{query}", environ_base={"REMOTE_ADDR": ip})
+        return response.status_code, (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=200) as pool:
+        outcomes = list(pool.map(fire, requests))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(ms for _, ms in outcomes)
+    statuses = Counter(code for code, _ in outcomes)
+    upstream = sum(flight_checker.amadeus_client.calls.values())
+    print(f"{label:28s} {len(requests):4d} req | upstream {upstream:4d} | "
+          f"status {dict(statuses)} | p50 {statistics.median(latencies):6.1f} ms | "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1]:6.1f} ms | {elapsed:5.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake upstream latency (s)")
+    args = parser.parse_args()
+    n = args.requests
+
+    routes = [(o, d) for o in AIRPORTS for d in AIRPORTS if o != d]
+    date = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+    same = f"origin=SHA&destination=YVR&date={date}"
+    distinct = [f"origin={o}&destination={d}&date={date}" for o, d in routes[:n]]
+
+    burst("identical, many clients", [(same, f"10.0.{i // 250}.{i % 250}") for i in range(n)],
+          args.latency)
+    burst("distinct, many clients",
+          [(q, f"10.1.{i // 250}.{i % 250}") for i, q in enumerate(distinct)], args.latency)
+    burst("distinct, one client", [(q, "10.2.0.1") for q in distinct], args.latency)
+
+
+if __name__ == "__main__":
+    main()
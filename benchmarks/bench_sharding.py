@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Throughput of sharded route execution against the fake provider.
+
+Runs the same route matrix with 1, 2, 4 and 8 shards, one rate-limited
+key per shard, and reports routes/second and speed-up over one shard.
+
+    python benchmarks/bench_sharding.py [--routes 320] [--latency 0.05] [--rate 10]
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@contextlib.contextmanager
+def silenced_stdout():
+    """Send fd 1 to /dev/null so worker processes' progress prints vanish too"""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--routes", type=int, default=320)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake per-call latency (s)")
+    parser.add_argument("--rate", type=float, default=10, help="requests/second per key")
+    parser.add_argument("--shards", default="1,2,4,8")
+    args = parser.parse_args()
+
+    # Worker processes read these at import time
+    os.environ["AMADEUS_PROVIDER"] = "fake"
+    os.environ["FAKE_PROVIDER_LATENCY"] = str(args.latency)
+    os.environ["AMADEUS_RATE_LIMIT"] = str(args.rate)
+    os.environ.pop("AMADEUS_CLIENT_ID", None)
+
+    import flight_checker
+
+    codes = [f"A{i:02d}" for i in range(40)]
+    routes = [(o, d) for o in codes for d in codes if o != d][:args.routes]
+    print(f"{len(routes)} routes, {args.latency * 1000:.0f} ms per call, "
+          f"{args.rate:g} req/s per key, {os.cpu_count()} CPUs")
+
+    baseline = None
+    for shards in [int(n) for n in args.shards.split(",")]:
+        keys = ",".join(f"key{i}:secret{i}" for i in range(shards))
+        os.environ["AMADEUS_CREDENTIALS"] = keys
+        start = time.perf_counter()
+        with silenced_stdout():
+            priced = sum(price is not None for *_, price, _ in
+                         flight_checker.query_routes_sharded(routes, shards))
+        elapsed = time.perf_counter() - start
+        throughput = len(routes) / elapsed
+        baseline = baseline or throughput
+        print(f"{shards} shard(s), {shards} key(s): {elapsed:6.2f} s | "
+              f"{throughput:6.1f} routes/s | x{throughput / baseline:4.2f} | "
+              f"{priced}/{len(routes)} priced")
+
+
+if __name__ == "__main__":
+    main()
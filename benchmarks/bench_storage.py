@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Storage size and query time of the full vs delta price-history layouts.
+
+Writes a year of synthetic daily runs into both layouts, checks that the
+read methods return the same logical rows, then times them.
+
+    python benchmarks/bench_storage.py [--days 365] [--airports 20] [--change-rate 0.1]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import FlightDatabase
+
+# Columns whose values are layout-specific (row ids, insert timestamps)
+PHYSICAL_COLUMNS = ("id", "created_at")
+
+
+def synthetic_runs(days, airports, change_rate, seed=11):
+    """Yield (run_date, results) with prices that change on change_rate of days"""
+    rng = random.Random(seed)
+    codes = [f"A{i:02d}" for i in range(airports)]
+    state = {}
+    for o in codes:
+        for d in codes:
+            if o != d:
+                state[(o, d)] = (f"{rng.randint(2000, 15000)}.00", "MU581 <-> MU582")
+
+    start = date(2025, 1, 1)
+    for day in range(days):
+        results = {o: {} for o in codes}
+        for (o, d), (price, segs) in state.items():
+            if rng.random() < change_rate:
+                if rng.random() < 0.05:
+                    price, segs = "N/A", "Not found"
+                else:
+                    price = f"{rng.randint(2000, 15000)}.00"
+                    segs = rng.choice(["MU581 <-> MU582", "CA931 / AC26 <-> AC25"])
+                state[(o, d)] = (price, segs)
+            results[o][d] = (price, segs)
+        yield (start + timedelta(days=day)).isoformat(), results
+
+
+def logical(rows):
+    return [{k: v for k, v in row.items() if k not in PHYSICAL_COLUMNS} for row in rows]
+
+
+def timed(fn, calls):
+    start = time.perf_counter()
+    for args in calls:
+        fn(*args)
+    return (time.perf_counter() - start) * 1000 / len(calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--airports", type=int, default=20)
+    parser.add_argument("--change-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        dbs = {
+            mode: FlightDatabase(os.path.join(workdir, f"{mode}.db"), storage_mode=mode)
+            for mode in ("full", "delta")
+        }
+
+        write_ms = {mode: 0.0 for mode in dbs}
+        dates = []
+        for run_date, results in synthetic_runs(args.days, args.airports, args.change_rate):
+            dates.append(run_date)
+            for mode, db in dbs.items():
+                start = time.perf_counter()
+                db.save_flight_results(results, "CNY", None, run_date=run_date)
+                write_ms[mode] += (time.perf_counter() - start) * 1000
+
+        rng = random.Random(3)
+        codes = [f"A{i:02d}" for i in range(args.airports)]
+        routes = [(o, d) for o in codes for d in codes if o != d]
+        history_calls = [rng.choice(routes) for _ in range(50)]
+        date_calls = [(rng.choice(dates),) for _ in range(20)]
+
+        # Same logical answers from both layouts
+        full, delta = dbs["full"], dbs["delta"]
+        for route in history_calls[:10]:
+            assert full.get_price_history(*route) == delta.get_price_history(*route), route
+        for (run_date,) in date_calls[:5]:
+            assert logical(full.get_results_by_date(run_date)) == \
+                logical(delta.get_results_by_date(run_date)), run_date
+        assert logical(full.get_latest_results()) == logical(delta.get_latest_results())
+
+        print(f"{args.days} daily runs x {len(routes)} routes, "
+              f"change rate {args.change_rate:.0%}")
+        print(f"{'layout':8s} {'size MB':>9s} {'rows':>9s} {'write/run':>10s} "
+              f"{'history':>9s} {'by date':>9s} {'latest':>9s}")
+        for mode, db in dbs.items():
+            table = "flight_results" if mode == "full" else "flight_intervals"
+            with sqlite3.connect(db.db_path) as conn:
+                conn.execute("VACUUM")
+                rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            size_mb = os.path.getsize(db.db_path) / 1e6
+            print(f"{mode:8s} {size_mb:9.2f} {rows:9d} "
+                  f"{write_ms[mode] / len(dates):8.1f}ms "
+                  f"{timed(db.get_price_history, history_calls):7.2f}ms "
+                  f"{timed(db.get_results_by_date, date_calls):7.2f}ms "
+                  f"{timed(db.get_latest_results, [()] * 5):7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
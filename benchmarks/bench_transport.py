@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Per-request latency of the Amadeus client against a local HTTPS stub.
+
+Compares the SDK default (new client per run, urlopen per call) with the
+keep-alive transport + shared token cache. The stub delays the token
+endpoint to stand in for the real OAuth round trip.
+
+    python benchmarks/bench_transport.py [--runs 10] [--calls 5]
+"""
+
+import argparse
+import functools
+import json
+import os
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import urlopen
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from amadeus import Client
+from amadeus_transport import KeepAliveTransport, create_client
+
+TOKEN_DELAY = 0.05
+
+OFFER = {
+    "price": {"grandTotal": "12345.00"},
+    "itineraries": [{"segments": [{"carrierCode": "MU", "number": "581"}]}],
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    stats = {"token_requests": 0, "connections": set()}
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.stats["token_requests"] += 1
+        time.sleep(TOKEN_DELAY)
+        self._send_json({"access_token": "stub-token", "expires_in": 1799})
+
+    def do_GET(self):
+        self.stats["connections"].add(self.client_address)
+        self._send_json({"data": [OFFER]})
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(workdir):
+    cert = os.path.join(workdir, "cert.pem")
+    key = os.path.join(workdir, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    server = ThreadingHTTPServer(("localhost", 0), StubHandler)
+    server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_ctx.load_cert_chain(cert, key)
+    server.socket = server_ctx.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    client_ctx = ssl.create_default_context(cafile=cert)
+    return server, client_ctx
+
+
+def measure(make_client, runs, calls):
+    """Latency of each flight_offers_search call, one fresh client per run"""
+    latencies = []
+    StubHandler.stats = {"token_requests": 0, "connections": set()}
+    for _ in range(runs):
+        client = make_client()
+        for _ in range(calls):
+            start = time.perf_counter()
+            client.shopping.flight_offers_search.get(
+                originLocationCode="SHA", destinationLocationCode="YVR",
+                departureDate="2025-10-01", adults=1,
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, dict(StubHandler.stats)
+
+
+def report(name, latencies, stats):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:28s} mean {statistics.mean(latencies):7.2f} ms | "
+          f"median {statistics.median(latencies):7.2f} ms | p95 {p95:7.2f} ms | "
+          f"token exchanges {stats['token_requests']:3d} | "
+          f"connections {len(stats['connections']):3d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10, help="simulated checker runs")
+    parser.add_argument("--calls", type=int, default=5, help="searches per run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server, ctx = start_stub(workdir)
+        port = server.server_address[1]
+        options = {"host": "localhost", "port": port, "ssl": True}
+
+        def baseline():
+            return Client(client_id="id", client_secret="secret",
+                          http=functools.partial(urlopen, context=ctx), **options)
+
+        transport = KeepAliveTransport(ssl_context=ctx)
+        token_cache = os.path.join(workdir, "tokens.db")
+
+        def pooled():
+            return create_client("id", "secret", transport=transport,
+                                 token_cache_path=token_cache, **options)
+
+        print(f"{args.runs} runs x {args.calls} searches against https://localhost:{port}")
+        report("urlopen, per-client token", *measure(baseline, args.runs, args.calls))
+        report("keep-alive + token cache", *measure(pooled, args.runs, args.calls))
+        transport.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Amadeus credential pool with per-key rate limiting.
+
+Credentials come from AMADEUS_CREDENTIALS ("id1:secret1,id2:secret2") plus
+the classic AMADEUS_CLIENT_ID / AMADEUS_CLIENT_SECRET pair. Each key gets
+its own token-bucket limiter (AMADEUS_RATE_LIMIT requests/second), and a
+PooledClient spreads calls over the keys of one process.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+Credential = Tuple[str, str]
+
+# Requests per second allowed per key (Amadeus test environment: 10 TPS)
+RATE_LIMIT = float(os.getenv('AMADEUS_RATE_LIMIT', '10'))
+
+
+def load_credentials() -> List[Credential]:
+    """All configured (client_id, client_secret) pairs, without duplicates"""
+    pairs: List[Credential] = []
+    for entry in os.getenv('AMADEUS_CREDENTIALS', '').split(','):
+        client_id, sep, secret = entry.strip().partition(':')
+        if sep and client_id and secret:
+            pairs.append((client_id, secret))
+
+    client_id = os.getenv('AMADEUS_CLIENT_ID')
+    secret = os.getenv('AMADEUS_CLIENT_SECRET')
+    if client_id and secret:
+        pairs.insert(0, (client_id, secret))
+    return list(dict.fromkeys(pairs))
+
+
+def assign_credentials(credentials: List[Credential],
+                       shards: int) -> List[Tuple[List[Credential], float]]:
+    """Split keys across shards: (keys, per-key rate) for each shard.
+
+    With at least as many keys as shards every shard gets its own keys.
+    Otherwise shards share keys round-robin and split each key's rate
+    between the shards using it.
+    """
+    if shards <= len(credentials):
+        return [(credentials[i::shards], RATE_LIMIT) for i in range(shards)]
+
+    sharers = [0] * len(credentials)
+    for i in range(shards):
+        sharers[i % len(credentials)] += 1
+    return [
+        ([credentials[i % len(credentials)]], RATE_LIMIT / sharers[i % len(credentials)])
+        for i in range(shards)
+    ]
+
+
+class RateLimiter:
+    """Thread-safe token bucket; acquire() blocks until a request may go."""
+
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is ready)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (1 - self.tokens) / self.rate)
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class _PooledCall:
+    """Attribute path (e.g. shopping.flight_offers_search.get) resolved per call."""
+
+    def __init__(self, pool: "PooledClient", path: Tuple[str, ...]):
+        self._pool = pool
+        self._path = path
+
+    def __getattr__(self, name: str) -> "_PooledCall":
+        return _PooledCall(self._pool, self._path + (name,))
+
+    def __call__(self, *args, **kwargs):
+        client = self._pool.next_client()
+        target = client
+        for name in self._path:
+            target = getattr(target, name)
+        try:
+            return target(*args, **kwargs)
+        except Exception as exc:
+            # Revoked token: drop it for the key that served this call
+            if getattr(getattr(exc, 'response', None), 'status_code', None) == 401:
+                self._pool.invalidate(client)
+            raise
+
+
+class PooledClient:
+    """Looks like an Amadeus client; each call goes to the least-throttled key.
+
+    A 401 from a member is handled here: invalidate_fn(member) drops that
+    key's token, so callers need not know which key served the call.
+    """
+
+    # No single token to invalidate; members are invalidated on their own 401s
+    access_token = None
+
+    def __init__(self, credentials: List[Credential], rate: float,
+                 client_factory: Callable[[Credential], Any],
+                 invalidate_fn: Optional[Callable[[Any], None]] = None):
+        self.members = [(client_factory(cred), RateLimiter(rate)) for cred in credentials]
+        self.invalidate_fn = invalidate_fn
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def invalidate(self, client):
+        if self.invalidate_fn is not None:
+            self.invalidate_fn(client)
+
+    def next_client(self):
+        with self._lock:
+            # Round-robin start so ties rotate through the keys
+            start = self._next
+            self._next = (self._next + 1) % len(self.members)
+            order = self.members[start:] + self.members[:start]
+            client, limiter = min(order, key=lambda member: member[1].wait_time())
+        limiter.acquire()
+        return client
+
+    @property
+    def shopping(self) -> _PooledCall:
+        return _PooledCall(self, ('shopping',))
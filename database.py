@@ -1,11 +1,25 @@
+import os
 import sqlite3
 import json
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
+from fx import to_canonical
+
+# 'full' stores a row per route per run; 'delta' stores one row per unchanged
+# price interval and expands it back into per-run rows on read. Switching
+# either way is safe: on startup each mode copies in any run dates the other
+# layout recorded after its own latest one (see _sync_from_full/_sync_from_delta).
+STORAGE_MODE = os.getenv('FLIGHT_STORAGE_MODE', 'full').lower()
+
 class FlightDatabase:
-    def __init__(self, db_path: str = "flight_data.db"):
+    def __init__(self, db_path: str = "flight_data.db", storage_mode: Optional[str] = None):
         self.db_path = db_path
+        self.storage_mode = (storage_mode or STORAGE_MODE).lower()
+        if self.storage_mode not in ('full', 'delta'):
+            raise ValueError(f"Unknown storage mode: {self.storage_mode}")
+        # Read queries go through this table (full) or view (delta)
+        self.results_source = 'flight_results' if self.storage_mode == 'full' else 'flight_results_delta'
         self.init_database()
     
     def init_database(self):
@@ -20,9 +34,19 @@ class FlightDatabase:
                     price TEXT,
                     segments TEXT,
                     currency TEXT,
+                    price_amount REAL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
+            self._ensure_column(conn, 'flight_results', 'price_amount', 'REAL')
+            # Latest run (date) and latest row per route (adaptive refreshes)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_flight_results_date ON flight_results (date)
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_flight_results_route
+                ON flight_results (origin, destination, id)
+            """)
             
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS job_runs (
@@ -35,25 +59,190 @@ class FlightDatabase:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
+
+            if self.storage_mode == 'delta':
+                self._init_delta_tables(conn)
+                self._sync_from_full(conn)
+            else:
+                self._sync_from_delta(conn)
+
+    def _sync_from_full(self, conn: sqlite3.Connection):
+        """Replay flight_results rows newer than the latest interval (delta mode).
+
+        Covers the first switch to delta on an existing database and any
+        runs made in full mode since; a no-op once both are in step.
+        """
+        rows = conn.execute("""
+            SELECT date, origin, destination, price, segments, currency
+            FROM flight_results
+            WHERE date > COALESCE((SELECT MAX(last_seen) FROM flight_intervals), '')
+            ORDER BY date, id
+        """).fetchall()
+        for date_str, origin, destination, price, segments, currency in rows:
+            self._record_observation(conn, date_str, origin, destination,
+                                     price, segments, currency)
+
+    def _sync_from_delta(self, conn: sqlite3.Connection):
+        """Expand intervals newer than the latest flight_results date (full mode)"""
+        has_intervals = conn.execute("""
+            SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'flight_intervals'
+        """).fetchone()
+        if not has_intervals:
+            return
+        self._ensure_column(conn, 'flight_intervals', 'price_amount', 'REAL')
+        conn.execute("""
+            INSERT INTO flight_results
+            (date, origin, destination, price, segments, currency, price_amount, created_at)
+            SELECT r.run_date, i.origin, i.destination, i.price, i.segments,
+                   i.currency, i.price_amount, i.last_seen_at
+            FROM (SELECT DISTINCT run_date FROM job_runs) r
+            JOIN flight_intervals i
+              ON r.run_date BETWEEN i.first_seen AND i.last_seen
+            WHERE r.run_date > COALESCE((SELECT MAX(date) FROM flight_results), '')
+            ORDER BY r.run_date, i.origin, i.destination
+        """)
+
+    def _ensure_column(self, conn: sqlite3.Connection, table: str, column: str, decl: str):
+        """Add a column to databases created before it existed"""
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+    def _init_delta_tables(self, conn: sqlite3.Connection):
+        """Interval table for delta storage plus a view shaped like flight_results.
+
+        A route/answer pair is one row covering [first_seen, last_seen]; an
+        interval is only extended when the route was also seen on the previous
+        run, so expanding it over job_runs dates reproduces the full layout.
+        """
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS flight_intervals (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                origin TEXT NOT NULL,
+                destination TEXT NOT NULL,
+                price TEXT,
+                segments TEXT,
+                currency TEXT,
+                price_amount REAL,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        self._ensure_column(conn, 'flight_intervals', 'price_amount', 'REAL')
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_flight_intervals_route
+            ON flight_intervals (origin, destination, last_seen)
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_flight_intervals_span
+            ON flight_intervals (last_seen, first_seen)
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_job_runs_date ON job_runs (run_date)
+        """)
+        # Recreated so views from older schemas pick up new columns
+        conn.execute("DROP VIEW IF EXISTS flight_results_delta")
+        conn.execute("""
+            CREATE VIEW flight_results_delta AS
+            SELECT i.id, r.run_date AS date, i.origin, i.destination,
+                   i.price, i.segments, i.currency, i.price_amount,
+                   i.last_seen_at AS created_at
+            FROM (SELECT DISTINCT run_date FROM job_runs) r
+            JOIN flight_intervals i
+              ON r.run_date BETWEEN i.first_seen AND i.last_seen
+        """)
+
+    def _previous_run_date(self, conn: sqlite3.Connection, date_str: str) -> Optional[str]:
+        return conn.execute(
+            "SELECT MAX(run_date) FROM job_runs WHERE run_date < ?", (date_str,)
+        ).fetchone()[0]
+
+    def _retract_interval(self, conn: sqlite3.Connection, interval_id: int,
+                          first_seen: str, date_str: str):
+        """Undo an interval's observation on date_str (same-day rerun)"""
+        previous = self._previous_run_date(conn, date_str)
+        if first_seen >= date_str or previous is None or previous < first_seen:
+            conn.execute("DELETE FROM flight_intervals WHERE id = ?", (interval_id,))
+        else:
+            conn.execute("UPDATE flight_intervals SET last_seen = ? WHERE id = ?",
+                         (previous, interval_id))
+
+    def _record_observation(self, conn: sqlite3.Connection, date_str: str,
+                            origin: str, destination: str, price: Optional[str],
+                            segments: Optional[str], currency: str):
+        """Extend the route's current interval or open a new one (delta mode)"""
+        latest_sql = """
+            SELECT id, price, segments, currency, first_seen, last_seen
+            FROM flight_intervals
+            WHERE origin = ? AND destination = ?
+            ORDER BY last_seen DESC, id DESC LIMIT 1
+        """
+        current = conn.execute(latest_sql, (origin, destination)).fetchone()
+
+        # Already observed today: identical answers just touch the interval,
+        # anything else rolls today's observation back first
+        if current and current[5] >= date_str:
+            if current[1:4] == (price, segments, currency):
+                conn.execute("UPDATE flight_intervals SET last_seen_at = CURRENT_TIMESTAMP WHERE id = ?",
+                             (current[0],))
+                return
+            self._retract_interval(conn, current[0], current[4], date_str)
+            current = conn.execute(latest_sql, (origin, destination)).fetchone()
+
+        if (current and current[1:4] == (price, segments, currency)
+                and current[5] == self._previous_run_date(conn, date_str)):
+            conn.execute("""
+                UPDATE flight_intervals
+                SET last_seen = ?, last_seen_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (date_str, current[0]))
+            return
+
+        conn.execute("""
+            INSERT INTO flight_intervals
+            (origin, destination, price, segments, currency, price_amount, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (origin, destination, price, segments, currency,
+              to_canonical(price, currency), date_str, date_str))
     
     def save_flight_results(self, results: Dict[str, Dict[str, tuple]], 
-                          currency: str, min_price: Optional[float] = None):
-        """Save flight search results to database"""
+                          currency: str, min_price: Optional[float] = None,
+                          run_date: Optional[str] = None):
+        """Save flight search results to database (run_date defaults to today)"""
         with sqlite3.connect(self.db_path) as conn:
-            date_str = datetime.now().strftime('%Y-%m-%d')
-            
-            # Clear existing results for today
-            conn.execute("DELETE FROM flight_results WHERE date = ?", (date_str,))
+            date_str = run_date or datetime.now().strftime('%Y-%m-%d')
             
-            # Save individual results
-            for origin in results:
-                for dest in results[origin]:
-                    price, segments = results[origin][dest]
-                    conn.execute("""
-                        INSERT INTO flight_results 
-                        (date, origin, destination, price, segments, currency)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (date_str, origin, dest, price, segments, currency))
+            if self.storage_mode == 'delta':
+                # Routes dropped since an earlier run today lose today's observation
+                stale = conn.execute("""
+                    SELECT id, origin, destination, first_seen FROM flight_intervals
+                    WHERE last_seen = ?
+                """, (date_str,)).fetchall()
+                for interval_id, origin, dest, first_seen in stale:
+                    if dest not in results.get(origin, {}):
+                        self._retract_interval(conn, interval_id, first_seen, date_str)
+
+                for origin in results:
+                    for dest in results[origin]:
+                        price, segments = results[origin][dest]
+                        self._record_observation(conn, date_str, origin, dest,
+                                                 price, segments, currency)
+            else:
+                # Clear existing results for today
+                conn.execute("DELETE FROM flight_results WHERE date = ?", (date_str,))
+                
+                # Save individual results
+                for origin in results:
+                    for dest in results[origin]:
+                        price, segments = results[origin][dest]
+                        conn.execute("""
+                            INSERT INTO flight_results 
+                            (date, origin, destination, price, segments, currency, price_amount)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)
+                        """, (date_str, origin, dest, price, segments, currency,
+                              to_canonical(price, currency)))
             
             # Save job run summary
             total_routes = sum(len(dests) for dests in results.values())
@@ -69,29 +258,116 @@ class FlightDatabase:
                 VALUES (?, ?, ?, ?, ?)
             """, (date_str, "completed", total_routes, successful_routes, min_price))
     
-    def get_latest_results(self) -> List[Dict[str, Any]]:
-        """Get latest flight results"""
+    def save_route_result(self, origin: str, destination: str, price: Optional[str],
+                          segments: Optional[str], currency: str):
+        """Save a single route observation for today (adaptive scheduler refresh)"""
+        with sqlite3.connect(self.db_path) as conn:
+            date_str = datetime.now().strftime('%Y-%m-%d')
+
+            if self.storage_mode == 'delta':
+                self._record_observation(conn, date_str, origin, destination,
+                                         price, segments, currency)
+            else:
+                # Replace any earlier observation of this route today
+                conn.execute("""
+                    DELETE FROM flight_results
+                    WHERE date = ? AND origin = ? AND destination = ?
+                """, (date_str, origin, destination))
+                conn.execute("""
+                    INSERT INTO flight_results
+                    (date, origin, destination, price, segments, currency, price_amount)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (date_str, origin, destination, price, segments, currency,
+                      to_canonical(price, currency)))
+
+            # Keep one rolling 'adaptive' job run per day so history pages see it
+            if self.storage_mode == 'delta':
+                today_sql = "SELECT price FROM flight_intervals WHERE last_seen = ?"
+            else:
+                today_sql = "SELECT price FROM flight_results WHERE date = ?"
+            total_routes, successful_routes, min_price = conn.execute(f"""
+                SELECT COUNT(*),
+                       COUNT(CASE WHEN price != 'N/A' THEN 1 END),
+                       MIN(CASE WHEN price != 'N/A' THEN CAST(price AS REAL) END)
+                FROM ({today_sql})
+            """, (date_str,)).fetchone()
+            updated = conn.execute("""
+                UPDATE job_runs
+                SET total_routes = ?, successful_routes = ?, min_price = ?
+                WHERE run_date = ? AND status = 'adaptive'
+            """, (total_routes, successful_routes, min_price, date_str)).rowcount
+            if not updated:
+                conn.execute("""
+                    INSERT INTO job_runs
+                    (run_date, status, total_routes, successful_routes, min_price)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (date_str, "adaptive", total_routes, successful_routes, min_price))
+
+    def get_latest_results(self, max_age_days: int = 7) -> List[Dict[str, Any]]:
+        """Get the latest results.
+
+        After a full matrix run that is the run's rows, so routes dropped from
+        the config disappear. While the adaptive scheduler is running, routes
+        are refreshed on different days, so it is the latest row per route
+        among those refreshed within max_age_days of the newest one.
+        """
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
-            cursor = conn.execute("""
-                SELECT * FROM flight_results 
-                WHERE date = (SELECT MAX(date) FROM flight_results)
-                ORDER BY origin, destination
-            """)
+            if self.storage_mode == 'delta':
+                table, date_col, date_index = 'flight_intervals', 'last_seen', 'idx_flight_intervals_span'
+                columns = """id, last_seen AS date, origin, destination, price,
+                           segments, currency, price_amount, last_seen_at AS created_at"""
+            else:
+                table, date_col, date_index = 'flight_results', 'date', 'idx_flight_results_date'
+                columns = '*'
+
+            latest = conn.execute(f"SELECT MAX({date_col}) FROM {table}").fetchone()[0]
+            adaptive = conn.execute("""
+                SELECT 1 FROM job_runs WHERE run_date = ? AND status = 'adaptive'
+            """, (latest,)).fetchone()
+            if not adaptive:
+                cursor = conn.execute(f"""
+                    SELECT {columns} FROM {table}
+                    WHERE {date_col} = ?
+                    ORDER BY origin, destination
+                """, (latest,))
+            else:
+                cursor = conn.execute(f"""
+                    SELECT {columns} FROM {table}
+                    WHERE id IN (
+                        -- Only the window's rows; left alone SQLite walks the
+                        -- whole route index to serve the GROUP BY
+                        SELECT MAX(id) FROM {table} INDEXED BY {date_index}
+                        WHERE {date_col} >= date(?, ?)
+                        GROUP BY origin, destination
+                    )
+                    ORDER BY origin, destination
+                """, (latest, f'-{max_age_days} days'))
             return [dict(row) for row in cursor.fetchall()]
     
     def get_price_history(self, origin: str, destination: str) -> List[Dict[str, Any]]:
         """Get price history for a specific route"""
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
-            cursor = conn.execute("""
-                SELECT date, price, currency FROM flight_results 
+            cursor = conn.execute(f"""
+                SELECT date, price, currency, price_amount FROM {self.results_source} 
                 WHERE origin = ? AND destination = ? 
                 AND price != 'N/A'
                 ORDER BY date DESC LIMIT 30
             """, (origin, destination))
             return [dict(row) for row in cursor.fetchall()]
     
+    def get_price_observations(self) -> List[Dict[str, Any]]:
+        """Get every priced observation in chronological order (scheduler replay)"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(f"""
+                SELECT date, origin, destination, price FROM {self.results_source}
+                WHERE price != 'N/A'
+                ORDER BY date, id
+            """)
+            return [dict(row) for row in cursor.fetchall()]
+
     def get_job_runs(self) -> List[Dict[str, Any]]:
         """Get job run history"""
         with sqlite3.connect(self.db_path) as conn:
@@ -106,13 +382,13 @@ class FlightDatabase:
         """Get all job runs with details"""
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
-            cursor = conn.execute("""
+            cursor = conn.execute(f"""
                 SELECT 
                     jr.*,
                     COUNT(fr.id) as total_flights_found,
                     COUNT(CASE WHEN fr.price != 'N/A' THEN 1 END) as successful_flights
                 FROM job_runs jr
-                LEFT JOIN flight_results fr ON jr.run_date = fr.date
+                LEFT JOIN {self.results_source} fr ON jr.run_date = fr.date
                 GROUP BY jr.id
                 ORDER BY jr.created_at DESC
             """)
@@ -122,8 +398,8 @@ class FlightDatabase:
         """Get all flight results for a specific date"""
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
-            cursor = conn.execute("""
-                SELECT * FROM flight_results 
+            cursor = conn.execute(f"""
+                SELECT * FROM {self.results_source} 
                 WHERE date = ?
                 ORDER BY origin, destination
             """, (search_date,))
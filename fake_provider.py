@@ -0,0 +1,126 @@
+"""
+Offline stand-in for the Amadeus client.
+
+Set AMADEUS_PROVIDER=fake to run the checker, scheduler and web app without
+credentials or network. Prices are deterministic per route and date pair,
+and the bulk ``flight_dates`` endpoint returns the economy fares with a
+little cache noise, the way the real cached endpoint lags the live one and
+ignores the cabin.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+FAKE_LATENCY = float(os.getenv('FAKE_PROVIDER_LATENCY', '0'))
+
+CLASS_FACTOR = {"ECONOMY": 1.0, "PREMIUM_ECONOMY": 1.6, "BUSINESS": 3.5, "FIRST": 6.0}
+CARRIERS = ["MU", "CA", "EK", "AC", "CZ", "HU"]
+
+
+def _unit(*parts) -> float:
+    """Deterministic pseudo-random number in [0, 1) from the given parts"""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+def fake_fare(origin: str, destination: str, departure_date: str,
+              return_date: str = None, travel_class: str = "ECONOMY") -> float:
+    """Live fare for a route and date pair"""
+    base = 1500 + 6000 * _unit("route", origin, destination)
+    # Dates that are cheap in one cabin are only partly cheap in another, as
+    # with real fares; flight_dates quotes economy, so its ranking is a hint
+    shared = _unit("date", origin, destination, departure_date, return_date)
+    cabin = _unit("date", origin, destination, departure_date, return_date, travel_class)
+    day = 0.7 + 0.6 * (0.5 * shared + 0.5 * cabin)
+    legs = 1.8 if return_date else 1.0
+    return round(base * day * legs * CLASS_FACTOR.get(travel_class, 1.0), 2)
+
+
+class FakeResponse:
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+        self.result = {"data": data}
+        self.status_code = 200
+
+
+class _FlightOffersSearch:
+    def __init__(self, client: "FakeAmadeusClient"):
+        self.client = client
+
+    def get(self, **params) -> FakeResponse:
+        self.client._record("flight_offers_search")
+        origin = params["originLocationCode"]
+        destination = params["destinationLocationCode"]
+        departure = params["departureDate"]
+        ret = params.get("returnDate")
+        price = fake_fare(origin, destination, departure, ret,
+                          params.get("travelClass", "ECONOMY"))
+
+        carrier = CARRIERS[int(_unit("carrier", origin, destination) * len(CARRIERS))]
+        number = 100 + int(_unit("flight", origin, destination) * 800)
+        itineraries = [{"segments": [{"carrierCode": carrier, "number": str(number)}]}]
+        if ret:
+            itineraries.append({"segments": [{"carrierCode": carrier, "number": str(number + 1)}]})
+
+        return FakeResponse([{
+            "price": {"grandTotal": f"{price:.2f}", "currency": params.get("currencyCode", "EUR")},
+            "itineraries": itineraries,
+        }])
+
+
+class _FlightDates:
+    def __init__(self, client: "FakeAmadeusClient"):
+        self.client = client
+
+    def get(self, **params) -> FakeResponse:
+        self.client._record("flight_dates")
+        origin, destination = params["origin"], params["destination"]
+        first, _, last = params["departureDate"].partition(",")
+        start = datetime.strptime(first, "%Y-%m-%d")
+        end = datetime.strptime(last or first, "%Y-%m-%d")
+        one_way = str(params.get("oneWay", "false")).lower() == "true"
+        low, _, high = str(params.get("duration", "")).partition(",")
+        durations = [None] if one_way or not low else range(int(low), int(high or low) + 1)
+
+        data = []
+        day = start
+        while day <= end:
+            departure = day.strftime("%Y-%m-%d")
+            for duration in durations:
+                ret = (day + timedelta(days=duration)).strftime("%Y-%m-%d") if duration else None
+                live = fake_fare(origin, destination, departure, ret)
+                cached = live * (0.97 + 0.06 * _unit("cache", origin, destination, departure, ret))
+                item = {"type": "flight-date", "origin": origin, "destination": destination,
+                        "departureDate": departure, "price": {"total": f"{cached:.2f}"}}
+                if ret:
+                    item["returnDate"] = ret
+                data.append(item)
+            day += timedelta(days=1)
+        return FakeResponse(data)
+
+
+class _Shopping:
+    def __init__(self, client: "FakeAmadeusClient"):
+        self.flight_offers_search = _FlightOffersSearch(client)
+        self.flight_dates = _FlightDates(client)
+
+
+class FakeAmadeusClient:
+    """Implements the subset of ``amadeus.Client`` the flight checker uses."""
+
+    def __init__(self, latency: float = FAKE_LATENCY):
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self.shopping = _Shopping(self)
+
+    def _record(self, endpoint: str):
+        with self._lock:
+            self.calls[endpoint] += 1
+        if self.latency:
+            time.sleep(self.latency)
@@ -12,15 +12,24 @@ import smtplib
 import socket
 import tempfile
 import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
-from typing import Optional, Dict, Tuple
+from typing import Optional, Dict, Iterator, List, Tuple
 
 from dotenv import load_dotenv
 from amadeus import Client, ResponseError
+from amadeus_transport import create_client, invalidate_token
+from credentials import (Credential, PooledClient, RATE_LIMIT, assign_credentials,
+                         load_credentials)
 from database import FlightDatabase
+from fake_provider import FakeAmadeusClient
+from itinerary_optimizer import build_optimizer_html
+from fx import convert_results, get_rate_table
+from airports import expand_codes, get_index as get_airport_index, is_iata_code, same_metro
 # ❌ REMOVED: from scheduler import run_flight_check
 
 # ─── Config ────────────────────────────────────────────────────────────────
@@ -33,6 +42,10 @@ SENDER_EMAIL = os.getenv('SENDER_EMAIL')
 SENDER_EMAIL_PASSWORD = os.getenv('SENDER_EMAIL_PASSWORD')
 RECIPIENT_EMAIL = os.getenv('RECIPIENT_EMAIL')
 SEND_EMAIL = os.getenv('SEND_EMAIL', 'false').lower() == 'true'
+# 'amadeus' (live API) or 'fake' (offline, see fake_provider.py)
+AMADEUS_PROVIDER = os.getenv('AMADEUS_PROVIDER', 'amadeus').lower()
+# Courtesy pause between routes, in seconds
+REQUEST_DELAY = float(os.getenv('AMADEUS_REQUEST_DELAY', '1'))
 
 # Flight search configuration
 FLIGHT_CONFIG = {
@@ -43,9 +56,23 @@ FLIGHT_CONFIG = {
     "return_date": "2025-10-06",
     "cabin_class": "B",
     "currency": "CNY",
+    # Currency for reports; converted locally from stored prices (see fx.py)
+    "display_currency": os.getenv('DISPLAY_CURRENCY', 'CNY').upper(),
     "adults": 1,
     "max_offers": 1,
     "non_stop": False,
+    # "fixed" searches the dates above; "flexible" pre-scans a date window per
+    # route with the bulk cheapest-date endpoint and confirms only the top K
+    "search_mode": "fixed",
+    "flex_departure_days": 10,        # departure window starting at departure_date
+    "flex_duration_range": (4, 6),    # trip length in days (round trips)
+    "flex_confirm_top_k": 1,          # flight_dates ranks economy fares: raise for other cabins
+    # >1 partitions the route matrix across this many worker processes,
+    # splitting the configured credentials between them
+    "shards": int(os.getenv('FLIGHT_SHARDS', '1')),
+    # Replace metro codes (e.g. LON) with their airports (LHR, LGW, ...);
+    # otherwise metro codes are searched as a whole, as Amadeus does
+    "expand_metros": os.getenv('EXPAND_METROS', 'false').lower() == 'true',
 }
 
 CLASS_MAP = {
@@ -163,20 +190,45 @@ class ProgressReporter:
 # ─── Amadeus client ────────────────────────────────────────────────────────
 amadeus_client: Optional[Client] = None
 
-def initialize_amadeus_client() -> bool:
-    """Initialize Amadeus API client without test call"""
+def _configured_credentials() -> List[Credential]:
+    credentials = load_credentials()
+    if not credentials and AMADEUS_PROVIDER == 'fake':
+        credentials = [("fake", "fake")]
+    return credentials
+
+def _new_client(credential: Credential):
+    if AMADEUS_PROVIDER == 'fake':
+        return FakeAmadeusClient()
+    return create_client(*credential)
+
+def initialize_amadeus_client(credentials: Optional[List[Credential]] = None,
+                              rate: Optional[float] = None) -> bool:
+    """Initialize Amadeus API client without test call (reused across runs).
+
+    Several credentials (or an explicit rate) give a PooledClient that
+    rate-limits each key and spreads calls across them.
+    """
     global amadeus_client
-    
-    if not (AMADEUS_CLIENT_ID and AMADEUS_CLIENT_SECRET):
+
+    if amadeus_client is not None and credentials is None:
+        print("✅ Reusing Amadeus client")
+        return True
+
+    credentials = credentials or _configured_credentials()
+    if not credentials:
         print("❌ Amadeus credentials missing")
         return False
         
     try:
-        amadeus_client = Client(
-            client_id=AMADEUS_CLIENT_ID,
-            client_secret=AMADEUS_CLIENT_SECRET,
-        )
-        print("✅ Amadeus client created (skipping test call)")
+        if len(credentials) == 1 and rate is None:
+            amadeus_client = _new_client(credentials[0])
+        else:
+            amadeus_client = PooledClient(credentials, rate or RATE_LIMIT, _new_client,
+                                          invalidate_fn=invalidate_token)
+        if AMADEUS_PROVIDER == 'fake':
+            print("✅ Using offline fake Amadeus provider")
+        else:
+            print(f"✅ Amadeus client created with {len(credentials)} key(s) (skipping test call)")
         return True
         
     except Exception as exc:
@@ -194,12 +246,18 @@ def get_flight_offer_details(
     currency_code: str,
     max_offers: int,
     non_stop: bool,
+    raise_errors: bool = False,
 ) -> Tuple[Optional[str], Optional[str]]:
     """
     Fetch flight offers from Amadeus API with comprehensive error handling.
+
+    (None, None) means no offers; failed lookups also return it unless
+    raise_errors is set, in which case the error is logged and re-raised.
     """
     if amadeus_client is None:
         logging.error("Amadeus client not ready.")
+        if raise_errors:
+            raise RuntimeError("Amadeus client not ready")
         return None, None
 
     params = {
@@ -239,24 +297,216 @@ def get_flight_offer_details(
         print("⏰ TIMEOUT")
         logging.error("Timeout connecting to Amadeus API for %s -> %s", 
                      origin_code, destination_code)
+        if raise_errors:
+            raise
         return None, None
     except socket.error as err:
         print(f"🌐 NETWORK ERROR: {err}")
         logging.error("Network error for %s -> %s: %s", 
                      origin_code, destination_code, err)
+        if raise_errors:
+            raise
         return None, None
     except ResponseError as err:
         status = getattr(err.response, "status_code", "???")
         print(f"🚫 API ERROR [{status}]")
+        if status == 401:
+            # Token revoked or expired early – force re-authentication next call
+            # (a PooledClient has already invalidated the key that served it)
+            invalidate_token(amadeus_client)
         logging.error("Amadeus API error %s -> %s [%s]: %s",
                       origin_code, destination_code, status, str(err))
+        if raise_errors:
+            raise
         return None, None
     except Exception as exc:
         print(f"💥 UNEXPECTED ERROR: {exc}")
         logging.error("Unexpected error for %s -> %s: %s",
                       origin_code, destination_code, exc)
+        if raise_errors:
+            raise
         return None, None
 
+def get_cheapest_dates(
+    origin_code: str,
+    destination_code: str,
+    departure_start: str,
+    departure_days: int,
+    duration_range: Optional[Tuple[int, int]],
+    non_stop: bool,
+) -> List[Dict[str, object]]:
+    """
+    Bulk pre-scan: indicative prices for every date pair in one request.
+
+    Returns [{'departure_date', 'return_date', 'price'}] sorted by price,
+    or an empty list when the cached endpoint has nothing for the route.
+    """
+    if amadeus_client is None:
+        logging.error("Amadeus client not ready.")
+        return []
+
+    start = datetime.strptime(departure_start, "%Y-%m-%d")
+    end = start + timedelta(days=max(departure_days, 1) - 1)
+    params = {
+        "origin": origin_code,
+        "destination": destination_code,
+        "departureDate": f"{start:%Y-%m-%d},{end:%Y-%m-%d}",
+        "oneWay": str(duration_range is None).lower(),
+        "duration": f"{duration_range[0]},{duration_range[1]}" if duration_range else None,
+        "nonStop": str(non_stop).lower(),
+        "viewBy": "DATE",
+    }
+    params = {k: v for k, v in params.items() if v is not None}
+
+    try:
+        print(f"📅 Scanning dates {origin_code} → {destination_code}... ", end="", flush=True)
+        response = amadeus_client.shopping.flight_dates.get(**params)
+
+        candidates = []
+        for item in response.data or []:
+            try:
+                price = float(item["price"]["total"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            candidates.append({
+                "departure_date": item["departureDate"],
+                "return_date": item.get("returnDate"),
+                "price": price,
+            })
+        candidates.sort(key=lambda c: c["price"])
+        print(f"✅ {len(candidates)} date options")
+        return candidates
+
+    except ResponseError as err:
+        status = getattr(err.response, "status_code", "???")
+        print(f"🚫 DATE SCAN UNAVAILABLE [{status}]")
+        logging.warning("Cheapest-date scan failed %s -> %s [%s]: %s",
+                        origin_code, destination_code, status, str(err))
+        return []
+    except Exception as exc:
+        print(f"💥 UNEXPECTED ERROR: {exc}")
+        logging.error("Unexpected date-scan error for %s -> %s: %s",
+                      origin_code, destination_code, exc)
+        return []
+
+def query_route(origin: str, destination: str) -> Tuple[Optional[str], Optional[str]]:
+    """Price one route with the configured search mode."""
+    dep_date = FLIGHT_CONFIG["departure_date"]
+    round_trip = FLIGHT_CONFIG["trip_type"] == "W"
+    ret_date = FLIGHT_CONFIG["return_date"] if round_trip else None
+    travel_class = CLASS_MAP.get(FLIGHT_CONFIG["cabin_class"], "ECONOMY")
+    search_args = (travel_class, FLIGHT_CONFIG["adults"], FLIGHT_CONFIG["currency"],
+                   FLIGHT_CONFIG["max_offers"], FLIGHT_CONFIG["non_stop"])
+
+    if FLIGHT_CONFIG.get("search_mode") != "flexible":
+        return get_flight_offer_details(origin, destination, dep_date, ret_date, *search_args)
+
+    candidates = get_cheapest_dates(
+        origin, destination, dep_date,
+        FLIGHT_CONFIG["flex_departure_days"],
+        FLIGHT_CONFIG["flex_duration_range"] if round_trip else None,
+        FLIGHT_CONFIG["non_stop"],
+    )
+    if not candidates:
+        # No cached fares for this route – fall back to the fixed dates
+        return get_flight_offer_details(origin, destination, dep_date, ret_date, *search_args)
+
+    best: Tuple[Optional[str], Optional[str]] = (None, None)
+    best_val = None
+    for cand in candidates[:max(FLIGHT_CONFIG["flex_confirm_top_k"], 1)]:
+        price, segs = get_flight_offer_details(
+            origin, destination, cand["departure_date"], cand["return_date"], *search_args,
+        )
+        if price is None:
+            continue
+        try:
+            val = float(price)
+        except ValueError:
+            continue
+        if best_val is None or val < best_val:
+            dates = cand["departure_date"]
+            if cand["return_date"]:
+                dates += f" / {cand['return_date']}"
+            best, best_val = (price, f"{segs} ({dates})"), val
+    return best
+
+# ─── Config validation & route matrix ──────────────────────────────────────
+def validate_flight_config(config: Dict = FLIGHT_CONFIG) -> List[str]:
+    """Problems that would waste API calls, checked before any request is made."""
+    problems = []
+    airports = get_airport_index()
+    for field in ("origins", "destinations"):
+        if not config[field]:
+            problems.append(f"{field} is empty")
+        for code in config[field]:
+            if not is_iata_code(code):
+                problems.append(f"{field} must be three-letter IATA codes, got {code!r}")
+            elif not airports.is_known(code):
+                # The bundled list isn't exhaustive; let Amadeus be the judge
+                logging.warning("%s code %s is not in the airport list", field, code)
+
+    try:
+        dep = datetime.strptime(config["departure_date"], "%Y-%m-%d")
+        if config["trip_type"] == "W":
+            ret = datetime.strptime(config["return_date"], "%Y-%m-%d")
+            if ret < dep:
+                problems.append("return_date is before departure_date")
+    except (TypeError, ValueError):
+        problems.append("dates must be YYYY-MM-DD")
+
+    if config["cabin_class"] not in CLASS_MAP:
+        problems.append(f"cabin_class must be one of {', '.join(CLASS_MAP)}")
+    if not 1 <= config["adults"] <= 9:
+        problems.append("adults must be between 1 and 9")
+    if config.get("search_mode", "fixed") not in ("fixed", "flexible"):
+        problems.append("search_mode must be 'fixed' or 'flexible'")
+    for field in ("currency", "display_currency"):
+        if field in config and not get_rate_table().supports(config[field]):
+            problems.append(f"no exchange rate for {field} {config[field]!r}")
+    return problems
+
+def route_airports(config: Dict = FLIGHT_CONFIG) -> Tuple[List[str], List[str]]:
+    """Origins and destinations to query, de-duplicated and metro-expanded if configured."""
+    expand = config.get("expand_metros", False)
+    return (expand_codes(config["origins"], expand),
+            expand_codes(config["destinations"], expand))
+
+# ─── Sharded execution ─────────────────────────────────────────────────────
+def _run_shard(routes: List[Tuple[str, str]], credentials: List[Credential],
+               rate: float, config: Dict) -> List[Tuple[str, str, Optional[str], Optional[str]]]:
+    """Worker-process entry point: price a slice of the matrix with its own keys."""
+    global amadeus_client
+    FLIGHT_CONFIG.update(config)
+    amadeus_client = None
+    if not initialize_amadeus_client(credentials, rate):
+        return [(o, d, None, None) for o, d in routes]
+    return [(o, d, *query_route(o, d)) for o, d in routes]
+
+def query_routes_sharded(routes: List[Tuple[str, str]], shards: int
+                         ) -> Iterator[Tuple[str, str, Optional[str], Optional[str]]]:
+    """Partition routes across worker processes; yield results as shards finish."""
+    credentials = _configured_credentials()
+    if not credentials:
+        logging.error("No Amadeus credentials for sharded run.")
+        return
+    assignments = assign_credentials(credentials, shards)
+    partitions = [routes[i::shards] for i in range(shards)]
+    logging.info("Sharding %d routes across %d processes with %d key(s)",
+                 len(routes), shards, len(credentials))
+
+    # spawn: workers must not inherit pooled sockets or SQLite handles
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=shards, mp_context=context) as pool:
+        futures = [
+            pool.submit(_run_shard, part, keys, rate, dict(FLIGHT_CONFIG))
+            for part, (keys, rate) in zip(partitions, assignments) if part
+        ]
+        for future in as_completed(futures):
+            try:
+                yield from future.result()
+            except Exception as exc:
+                logging.error("Shard failed: %s", exc)
+
 # ─── HTML & PDF helpers ────────────────────────────────────────────────────
 def build_html_table(origins, destinations, results, currency):
     """Return a prettified HTML table + lowest price value."""
@@ -385,6 +635,29 @@ def send_email(subject: str, html_body: str, pdf_path: Optional[str] = None) ->
 
 
 # ─── Main workflow ────────────────────────────────────────────────────────
+def refresh_route(origin: str, destination: str, db: FlightDatabase) -> Optional[str]:
+    """Query a single route on the configured dates and store it (adaptive scheduler).
+
+    Always exactly one flight_offers_search call, even in flexible mode, so
+    the scheduler's one-request-per-refresh accounting of
+    DAILY_REQUEST_BUDGET holds.
+    """
+    ret_date = FLIGHT_CONFIG["return_date"] if FLIGHT_CONFIG["trip_type"] == "W" else None
+    currency = FLIGHT_CONFIG["currency"]
+
+    price, segs = get_flight_offer_details(
+        origin, destination, FLIGHT_CONFIG["departure_date"], ret_date,
+        CLASS_MAP.get(FLIGHT_CONFIG["cabin_class"], "ECONOMY"),
+        FLIGHT_CONFIG["adults"], currency,
+        FLIGHT_CONFIG["max_offers"], FLIGHT_CONFIG["non_stop"],
+    )
+    db.save_route_result(origin, destination,
+                         price if price else "N/A",
+                         segs if segs else "Not found",
+                         currency)
+    logging.info("Adaptive refresh %s->%s: %s", origin, destination, price or "N/A")
+    return price
+
 def run_flight_check():
     """Main flight checking workflow with database storage."""
     print("\n" + "="*80)
@@ -399,6 +672,17 @@ def run_flight_check():
     db = FlightDatabase()
     print("✅ Database ready!")
 
+    # Reject bad configs before any API quota is spent
+    problems = validate_flight_config()
+    if problems:
+        error_msg = "Invalid flight configuration: " + "; ".join(problems)
+        print(f"❌ {error_msg}")
+        logging.error(error_msg)
+        if SEND_EMAIL:
+            send_email("Flight Checker ❌  Invalid configuration",
+                       f"<p>{error_msg}</p>")
+        return
+
     if not initialize_amadeus_client():
         error_msg = "Could not authenticate with the Amadeus API."
         logging.error(error_msg)
@@ -407,15 +691,12 @@ def run_flight_check():
                        f"<p>{error_msg}</p>")
         return
 
-    origins = FLIGHT_CONFIG["origins"]
-    destinations = FLIGHT_CONFIG["destinations"]
+    origins, destinations = route_airports()
     dep_date = FLIGHT_CONFIG["departure_date"]
     ret_date = FLIGHT_CONFIG["return_date"] if FLIGHT_CONFIG["trip_type"] == "W" else None
     travel_class = CLASS_MAP.get(FLIGHT_CONFIG["cabin_class"], "ECONOMY")
     currency = FLIGHT_CONFIG["currency"]
-    adults = FLIGHT_CONFIG["adults"]
-    max_offers = FLIGHT_CONFIG["max_offers"]
-    non_stop = FLIGHT_CONFIG["non_stop"]
+    search_mode = FLIGHT_CONFIG.get("search_mode", "fixed")
 
     total_routes = len(origins) * len(destinations)
     print(f"\n📋 FLIGHT SEARCH CONFIGURATION:")
@@ -424,6 +705,9 @@ def run_flight_check():
     print(f"   Total Routes: {total_routes}")
     print(f"   Departure: {dep_date} | Return: {ret_date}")
     print(f"   Class: {travel_class} | Currency: {currency}")
+    if search_mode == "flexible":
+        print(f"   Flexible: {FLIGHT_CONFIG['flex_departure_days']} departure days, "
+              f"confirming top {FLIGHT_CONFIG['flex_confirm_top_k']} per route")
     print(f"   Estimated Time: ~{total_routes * 2} seconds")
     
     # Initialize progress reporter
@@ -431,28 +715,39 @@ def run_flight_check():
     
     results: Dict[str, Dict[str, Tuple[str, str]]] = {}
     logging.info("Querying %d routes", total_routes)
+    shards = FLIGHT_CONFIG.get("shards", 1)
+    sharded_routes = []
 
     for o in origins:
         results[o] = {}
         for d in destinations:
-            if o == d:
-                results[o][d] = ("N/A", "Same origin & destination")
+            if same_metro(o, d):
+                results[o][d] = ("N/A", "Same origin & destination" if o == d else "Same metro area")
                 progress.update(o, d, False, "N/A")
                 continue
+
+            if shards > 1:
+                # Placeholder keeps the matrix order; filled in below
+                results[o][d] = ("N/A", "Not found")
+                sharded_routes.append((o, d))
+                continue
                 
             # Add small delay between API calls to be respectful
-            time.sleep(1)
+            time.sleep(REQUEST_DELAY)
             
-            price, segs = get_flight_offer_details(
-                o, d, dep_date, ret_date,
-                travel_class, adults, currency, max_offers, non_stop,
-            )
+            price, segs = query_route(o, d)
             
             success = price is not None
             results[o][d] = (price if price else "N/A",
                              segs if segs else "Not found")
             progress.update(o, d, success, price)
 
+    if sharded_routes:
+        for o, d, price, segs in query_routes_sharded(sharded_routes, shards):
+            results[o][d] = (price if price else "N/A",
+                             segs if segs else "Not found")
+            progress.update(o, d, price is not None, price)
+
     # ─── Final Summary ───
     total_time = datetime.now() - start_time
     print(f"\n" + "="*80)
@@ -471,9 +766,16 @@ def run_flight_check():
     # ─── Optional email sending ───
     if SEND_EMAIL:
         print("\n📧 Preparing email report...")
+        display_currency = FLIGHT_CONFIG.get("display_currency", currency)
+        shown = results
+        if display_currency != currency:
+            # Same fares, re-expressed locally: no extra API calls
+            shown = convert_results(results, currency, display_currency)
+            table_html, best_price = build_html_table(origins, destinations, shown,
+                                                      display_currency)
         summary_block = (
             f'<p style="font-size:16px;">📉 <strong>Lowest fare found:</strong> '
-            f'<span style="color:#2e8b57;font-size:18px;">{currency} {best_price:,.0f}</span></p>'
+            f'<span style="color:#2e8b57;font-size:18px;">{display_currency} {best_price:,.0f}</span></p>'
             if best_price is not None else
             '<p>No numeric fares were returned.</p>'
         )
@@ -486,6 +788,8 @@ def run_flight_check():
             <p><strong>Success rate:</strong> {progress.successful_routes}/{total_routes} routes</p>
             {summary_block}
             {table_html}
+            {build_optimizer_html(origins, destinations, shown, display_currency,
+                                  one_way=FLIGHT_CONFIG["trip_type"] != "W")}
             <p style="font-size:12px;color:#777;">Generated on {generated_on}</p>
           </body>
         </html>
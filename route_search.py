@@ -0,0 +1,100 @@
+"""
+On-demand single-route lookups for the web API.
+
+Wraps an upstream lookup function with:
+- a short freshness cache, so repeat queries cost nothing,
+- single-flight coalescing, so concurrent identical queries share one call,
+- a per-client cap on concurrent upstream calls and a global one on top.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+SEARCH_CACHE_TTL = float(os.getenv('SEARCH_CACHE_TTL', '300'))
+SEARCH_MAX_PER_CLIENT = int(os.getenv('SEARCH_MAX_PER_CLIENT', '2'))
+SEARCH_MAX_UPSTREAM = int(os.getenv('SEARCH_MAX_UPSTREAM', '4'))
+# Expired entries are swept once the cache grows past this size
+CACHE_SWEEP_SIZE = 1024
+
+
+class TooManyRequests(Exception):
+    """Raised when a client already has its maximum upstream lookups running."""
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class RouteSearchService:
+    """Cache + single-flight front for an expensive lookup(key) function."""
+
+    def __init__(self, lookup: Callable[[Hashable], Any],
+                 ttl: float = SEARCH_CACHE_TTL,
+                 max_per_client: int = SEARCH_MAX_PER_CLIENT,
+                 max_upstream: int = SEARCH_MAX_UPSTREAM,
+                 clock: Callable[[], float] = time.monotonic):
+        self.lookup = lookup
+        self.ttl = ttl
+        self.max_per_client = max_per_client
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._cache: Dict[Hashable, Tuple[float, Any]] = {}
+        self._in_flight: Dict[Hashable, _InFlight] = {}
+        self._client_active: Dict[str, int] = {}
+        self._upstream = threading.BoundedSemaphore(max_upstream)
+        self.upstream_calls = 0
+
+    def search(self, key: Hashable, client_id: str) -> Tuple[Any, str]:
+        """Return (result, source) where source is 'cache', 'coalesced' or 'upstream'"""
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] > self.clock():
+                return cached[1], 'cache'
+
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                if self._client_active.get(client_id, 0) >= self.max_per_client:
+                    raise TooManyRequests(client_id)
+                self._client_active[client_id] = self._client_active.get(client_id, 0) + 1
+                call = self._in_flight[key] = _InFlight()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, 'coalesced'
+
+        try:
+            with self._upstream:
+                with self._lock:
+                    self.upstream_calls += 1
+                call.result = self.lookup(key)
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                if call.error is None:
+                    if len(self._cache) >= CACHE_SWEEP_SIZE:
+                        self._purge_expired_locked()
+                    self._cache[key] = (self.clock() + self.ttl, call.result)
+                del self._in_flight[key]
+                remaining = self._client_active[client_id] - 1
+                if remaining:
+                    self._client_active[client_id] = remaining
+                else:
+                    del self._client_active[client_id]
+            call.done.set()
+        return call.result, 'upstream'
+
+    def _purge_expired_locked(self):
+        now = self.clock()
+        for key in [k for k, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[key]
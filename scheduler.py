@@ -1,18 +1,49 @@
+import argparse
+import bisect
+import heapq
+import math
+import os
+import random
 import schedule
 import time
 import subprocess
 import logging
 from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 logging.basicConfig(level=logging.INFO)
 
+# 'daily' runs the full matrix once a day, 'adaptive' spends a request budget per route
+SCHEDULER_MODE = os.getenv('SCHEDULER_MODE', 'daily').lower()
+DAILY_REQUEST_BUDGET = int(os.getenv('DAILY_REQUEST_BUDGET', '48'))
+MIN_REFRESH_HOURS = float(os.getenv('ADAPTIVE_MIN_REFRESH_HOURS', '1'))
+MAX_REFRESH_HOURS = float(os.getenv('ADAPTIVE_MAX_REFRESH_HOURS', '72'))
+REPRIORITIZE_SECONDS = 3600
+
+# Volatility model: per-route std of log price changes per sqrt(day),
+# shrunk towards a prior until the route has enough history.
+DEFAULT_VOLATILITY = 0.05
+PRIOR_WEIGHT = 5
+# Urgency grows as 1 + URGENCY_DAYS / days_to_departure
+URGENCY_DAYS = 14
+# Opt-in saving: below 1.0 the full budget is only spent within URGENCY_DAYS
+# of the nearest departure; further out spending tapers as
+# URGENCY_DAYS / days_left, down to this share
+MIN_BUDGET_SHARE = float(os.getenv('ADAPTIVE_MIN_BUDGET_SHARE', '1.0'))
+
+Route = Tuple[str, str]
+History = List[Tuple[float, float]]  # (timestamp, price)
+# One departure timestamp for every route, or one per route
+Departures = Union[None, float, Dict[Route, Optional[float]]]
+
+
 def run_flight_check():
     """Run the flight checker script"""
     try:
         logging.info(f"Starting flight check at {datetime.now()}")
-        result = subprocess.run(['python', 'flight_checker.py'], 
+        result = subprocess.run(['python', 'flight_checker.py'],
                               capture_output=True, text=True)
-        
+
         if result.returncode == 0:
             logging.info("Flight check completed successfully")
         else:
@@ -23,8 +54,425 @@ def run_flight_check():
 # Schedule daily at 9 AM
 schedule.every().day.at("09:00").do(run_flight_check)
 
+
+# ─── Adaptive scheduling ─────────────────────────────────────────────────────
+def parse_price(value) -> Optional[float]:
+    """Parse a stored price string, returning None for N/A or garbage"""
+    try:
+        return float(str(value).replace(',', '').strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_volatility(history: History) -> float:
+    """Estimate a route's volatility from (timestamp, price) samples"""
+    returns = []
+    for (t0, p0), (t1, p1) in zip(history, history[1:]):
+        days = (t1 - t0) / 86400
+        if days <= 0 or p0 <= 0 or p1 <= 0:
+            continue
+        returns.append(math.log(p1 / p0) / math.sqrt(days))
+
+    if len(returns) < 2:
+        return DEFAULT_VOLATILITY
+
+    mean = sum(returns) / len(returns)
+    observed = math.sqrt(sum((r - mean) ** 2 for r in returns) / (len(returns) - 1))
+    weight = len(returns) / (len(returns) + PRIOR_WEIGHT)
+    return weight * observed + (1 - weight) * DEFAULT_VOLATILITY
+
+
+def departure_urgency(now: float, departure_ts: Optional[float]) -> float:
+    """Weight multiplier for routes close to departure (0 once departed)"""
+    if departure_ts is None:
+        return 1.0
+    days_left = (departure_ts - now) / 86400
+    if days_left < 0:
+        return 0.0
+    return 1.0 + URGENCY_DAYS / max(days_left, 1.0)
+
+
+def budget_share(now: float, departures: Iterable[Optional[float]]) -> float:
+    """Fraction of the daily budget worth spending given the routes' departures.
+
+    Weights are normalized across routes, so a departure date shared by all
+    of them cannot shift requests between routes; with MIN_BUDGET_SHARE
+    below 1 it changes how many requests are spent instead.
+    """
+    departures = list(departures)
+    if not departures or any(ts is None for ts in departures):
+        return 1.0
+    upcoming = [ts for ts in departures if ts >= now]
+    if not upcoming:
+        return MIN_BUDGET_SHARE
+    days_left = (min(upcoming) - now) / 86400
+    return min(1.0, max(MIN_BUDGET_SHARE, URGENCY_DAYS / max(days_left, 1e-9)))
+
+
+def allocate_intervals(weights: Dict[Route, float], budget_per_day: float,
+                       min_hours: float = MIN_REFRESH_HOURS,
+                       max_hours: float = MAX_REFRESH_HOURS) -> Dict[Route, Optional[float]]:
+    """Split the daily budget across routes in proportion to their weight.
+
+    Returns the refresh interval in seconds per route (None = never refresh).
+    """
+    total = sum(weights.values())
+    intervals: Dict[Route, Optional[float]] = {}
+    for route, weight in weights.items():
+        if weight <= 0 or total <= 0:
+            intervals[route] = None
+            continue
+        per_day = budget_per_day * weight / total
+        seconds = 86400 / per_day
+        intervals[route] = min(max(seconds, min_hours * 3600), max_hours * 3600)
+    return intervals
+
+
+class AdaptiveScheduler:
+    """Priority queue of routes keyed by next refresh time under a request budget.
+
+    history_fn(route) returns the route's (timestamp, price) samples and
+    refresh_fn(route) performs one upstream query, returning the price or None.
+    departure_ts is one timestamp for all routes or a {route: timestamp} map:
+    routes nearer departure get a larger share of the budget, and departed
+    routes none (see budget_share for spending less while departure is far off).
+    """
+
+    def __init__(self, routes: List[Route], budget_per_day: int,
+                 history_fn: Callable[[Route], History],
+                 refresh_fn: Callable[[Route], Optional[float]],
+                 departure_ts: Departures = None,
+                 clock: Callable[[], float] = time.time):
+        self.routes = list(routes)
+        self.budget_per_day = max(budget_per_day, 1)
+        self.history_fn = history_fn
+        self.refresh_fn = refresh_fn
+        self.departure_ts = departure_ts
+        self.clock = clock
+
+        self.last_refresh: Dict[Route, float] = {}
+        self.intervals: Dict[Route, Optional[float]] = {}
+        self.queue: List[Tuple[float, Route]] = []
+        self.next_slot = 0.0
+        self.last_reprioritized = None
+        self.requests_made = 0
+        self.requests_per_day = float(self.budget_per_day)
+
+    def departure_of(self, route: Route) -> Optional[float]:
+        if isinstance(self.departure_ts, dict):
+            return self.departure_ts.get(route)
+        return self.departure_ts
+
+    def reprioritize(self, now: float):
+        """Recompute weights from history and rebuild the due-time heap"""
+        weights = {
+            route: estimate_volatility(self.history_fn(route))
+            * departure_urgency(now, self.departure_of(route))
+            for route in self.routes
+        }
+        share = budget_share(now, (self.departure_of(route) for route in self.routes))
+        self.requests_per_day = max(self.budget_per_day * share, 1.0)
+        self.intervals = allocate_intervals(weights, self.requests_per_day)
+
+        self.queue = []
+        for route, interval in self.intervals.items():
+            if interval is None:
+                continue
+            # Never-seen routes are due immediately
+            due = self.last_refresh.get(route, now - interval) + interval
+            self.queue.append((due, route))
+        heapq.heapify(self.queue)
+        self.last_reprioritized = now
+
+    def step(self, now: Optional[float] = None) -> Optional[Route]:
+        """Refresh the most overdue route if the budget allows; return it"""
+        now = self.clock() if now is None else now
+        if (self.last_reprioritized is None
+                or now - self.last_reprioritized >= REPRIORITIZE_SECONDS):
+            self.reprioritize(now)
+
+        # Work-conserving: when a budget slot is free, the earliest-due route
+        # goes now rather than letting the slot go unused.
+        if not self.queue or now < self.next_slot:
+            return None
+
+        _, route = heapq.heappop(self.queue)
+        try:
+            self.refresh_fn(route)
+        except Exception as e:
+            logging.error(f"Adaptive refresh failed for {route[0]}->{route[1]}: {e}")
+        self.requests_made += 1
+        self.last_refresh[route] = now
+        # Pace requests evenly so the day's spend lasts the whole day
+        self.next_slot = now + 86400 / self.requests_per_day
+
+        interval = self.intervals.get(route)
+        if interval is not None:
+            heapq.heappush(self.queue, (now + interval, route))
+        return route
+
+    def seconds_until_next(self, now: float) -> float:
+        if not self.queue:
+            return REPRIORITIZE_SECONDS
+        return max(self.next_slot - now, 0.0)
+
+    def run_forever(self):
+        logging.info(f"Adaptive scheduler started: {len(self.routes)} routes, "
+                     f"{self.budget_per_day} requests/day")
+        while True:
+            now = self.clock()
+            self.step(now)
+            if not self.queue:
+                logging.error("Adaptive scheduler stopping: every route's departure has passed")
+                return
+            time.sleep(min(max(self.seconds_until_next(self.clock()), 1), 60))
+
+
+def run_adaptive_scheduler():
+    """Continuously refresh the configured routes from the flight checker"""
+    # Imported lazily: flight_checker configures logging and the Amadeus client
+    import flight_checker
+    from database import FlightDatabase
+
+    db = FlightDatabase()
+    problems = flight_checker.validate_flight_config()
+    if problems:
+        logging.error("Invalid flight configuration: %s", "; ".join(problems))
+        return
+    if not flight_checker.initialize_amadeus_client():
+        logging.error("Could not authenticate with the Amadeus API.")
+        return
+
+    config = flight_checker.FLIGHT_CONFIG
+    origins, destinations = flight_checker.route_airports(config)
+    routes = [(o, d) for o in origins for d in destinations
+              if not flight_checker.same_metro(o, d)]
+    departure_ts = datetime.strptime(config["departure_date"], '%Y-%m-%d').timestamp()
+    if departure_ts < time.time():
+        logging.error("departure_date %s has passed; nothing to refresh", config["departure_date"])
+        return
+
+    def history_fn(route):
+        rows = reversed(db.get_price_history(*route))
+        return [(datetime.strptime(r['date'], '%Y-%m-%d').timestamp(), p)
+                for r in rows if (p := parse_price(r['price'])) is not None]
+
+    def refresh_fn(route):
+        return flight_checker.refresh_route(route[0], route[1], db)
+
+    AdaptiveScheduler(routes, DAILY_REQUEST_BUDGET, history_fn, refresh_fn,
+                      departure_ts=departure_ts).run_forever()
+
+
+# ─── Simulation harness ──────────────────────────────────────────────────────
+class _ReplayedRoute:
+    """Step-function view of a route's true price over time"""
+
+    def __init__(self, samples: History):
+        self.times = [t for t, _ in samples]
+        self.prices = [p for _, p in samples]
+
+    def price_at(self, ts: float) -> Optional[float]:
+        idx = bisect.bisect_right(self.times, ts) - 1
+        return self.prices[idx] if idx >= 0 else None
+
+
+def _departure(departures: Departures, route: Route) -> Optional[float]:
+    return departures.get(route) if isinstance(departures, dict) else departures
+
+
+def _score(truth: Dict[Route, _ReplayedRoute], policy_step, start: float, end: float,
+           budget_per_day: float, departures: Departures = None) -> Dict[str, float]:
+    """Drive a policy over [start, end) and measure how stale its prices are.
+
+    policy_step(now) returns the refreshed route or None; each refresh learns the
+    true price at that instant. Staleness is sampled hourly for every route
+    until its departure, and separately over the last URGENCY_DAYS before it.
+    """
+    known: Dict[Route, float] = {}
+    tick = 86400 / budget_per_day
+    next_tick = start
+    abs_errors = []
+    near_errors = []
+    exact = 0
+    samples = 0
+    requests = 0
+
+    now = start
+    while now < end:
+        while next_tick <= now:
+            route = policy_step(next_tick)
+            if route is not None:
+                requests += 1
+                price = truth[route].price_at(next_tick)
+                if price is not None:
+                    known[route] = price
+            next_tick += tick
+
+        for route, replay in truth.items():
+            actual = replay.price_at(now)
+            departure = _departure(departures, route)
+            if actual is None or (departure is not None and now > departure):
+                continue
+            samples += 1
+            seen = known.get(route)
+            error = 1.0 if seen is None else abs(seen - actual) / actual
+            abs_errors.append(error)
+            exact += error < 1e-9
+            if departure is not None and departure - now <= URGENCY_DAYS * 86400:
+                near_errors.append(error)
+        now += 3600
+
+    score = {
+        'requests': requests,
+        'mean_abs_pct_error': round(100 * sum(abs_errors) / max(len(abs_errors), 1), 3),
+        'fresh_share_pct': round(100 * exact / max(samples, 1), 2),
+    }
+    if near_errors:
+        score['near_departure_pct_error'] = round(100 * sum(near_errors) / len(near_errors), 3)
+    return score
+
+
+def _adaptive_policy(truth: Dict[Route, _ReplayedRoute], budget_per_day: int,
+                     start: float, departure_ts: Departures):
+    """Adaptive scheduler step function that only sees the prices it paid for"""
+    observed: Dict[Route, History] = {route: [] for route in truth}
+    sim_clock = [start]
+
+    def refresh_fn(route):
+        price = truth[route].price_at(sim_clock[0])
+        if price is not None:
+            observed[route].append((sim_clock[0], price))
+        return price
+
+    adaptive = AdaptiveScheduler(list(truth), budget_per_day,
+                                 history_fn=lambda route: observed[route][-30:],
+                                 refresh_fn=refresh_fn,
+                                 departure_ts=departure_ts,
+                                 clock=lambda: sim_clock[0])
+
+    def step(now):
+        sim_clock[0] = now
+        return adaptive.step(now)
+    return step
+
+
+def simulate(histories: Dict[Route, History], budget_per_day: int,
+             departure_ts: Departures = None) -> Dict[str, Dict[str, float]]:
+    """Replay historical prices and score adaptive vs round-robin refreshes.
+
+    Round-robin is given exactly as many requests as the adaptive run made
+    (spread evenly, skipping departed routes), so the scores compare how
+    well each spends the same calls. With departure dates, the adaptive
+    scheduler ignoring them is scored too, isolating departure urgency.
+    """
+    truth = {route: _ReplayedRoute(samples) for route, samples in histories.items() if samples}
+    if not truth:
+        return {}
+    start = min(r.times[0] for r in truth.values())
+    end = max(r.times[-1] for r in truth.values()) + 86400
+
+    # Baseline: routes refreshed in a fixed rotation, departed ones skipped
+    rotation = list(truth)
+    position = [0]
+
+    def round_robin_step(now):
+        for _ in rotation:
+            route = rotation[position[0] % len(rotation)]
+            position[0] += 1
+            departure = _departure(departure_ts, route)
+            if departure is None or now <= departure:
+                return route
+        return None
+
+    scores = {'adaptive': _score(truth, _adaptive_policy(truth, budget_per_day, start, departure_ts),
+                                 start, end, budget_per_day, departure_ts)}
+    if departure_ts is not None:
+        scores['adaptive_no_departure'] = _score(
+            truth, _adaptive_policy(truth, budget_per_day, start, None),
+            start, end, budget_per_day, departure_ts)
+    # Nothing is refreshed after the last departure, so spread over the window before it
+    departures = [_departure(departure_ts, route) for route in truth]
+    active_end = end if None in departures else min(end, max(departures))
+    matched_per_day = scores['adaptive']['requests'] * 86400 / max(active_end - start, 1.0)
+    scores['round_robin'] = _score(truth, round_robin_step, start, end,
+                                   max(matched_per_day, 1e-9), departure_ts)
+    return scores
+
+
+def load_histories(db) -> Dict[Route, History]:
+    """Group stored observations into per-route (timestamp, price) series"""
+    histories: Dict[Route, History] = {}
+    for row in db.get_price_observations():
+        price = parse_price(row['price'])
+        if price is None:
+            continue
+        ts = datetime.strptime(row['date'], '%Y-%m-%d').timestamp()
+        histories.setdefault((row['origin'], row['destination']), []).append((ts, price))
+    return histories
+
+
+def synthetic_departures(histories: Dict[Route, History], first_day: int = 30,
+                         last_day: int = 110) -> Dict[Route, float]:
+    """Departure dates spread evenly over the replay window, one per route"""
+    start = min(samples[0][0] for samples in histories.values())
+    routes = sorted(histories)
+    step = (last_day - first_day) / max(len(routes) - 1, 1)
+    return {route: start + (first_day + i * step) * 86400 for i, route in enumerate(routes)}
+
+
+def synthetic_histories(routes: int = 40, days: int = 120, seed: int = 7) -> Dict[Route, History]:
+    """Random-walk price series with a mix of calm and volatile routes"""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1).timestamp()
+    histories: Dict[Route, History] = {}
+    for i in range(routes):
+        volatility = rng.choice([0.0, 0.005, 0.02, 0.08])
+        price = rng.uniform(2000, 12000)
+        series = []
+        for hour in range(0, days * 24, 6):
+            if rng.random() < 0.5:
+                price *= math.exp(rng.gauss(0, volatility))
+            series.append((start + hour * 3600, round(price, 2)))
+        histories[(f"O{i:02d}", f"D{i:02d}")] = series
+    return histories
+
+
 if __name__ == "__main__":
-    logging.info("Scheduler started")
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+    parser = argparse.ArgumentParser(description="Flight check scheduler")
+    parser.add_argument('--simulate', action='store_true',
+                        help="replay price history and score the adaptive scheduler")
+    parser.add_argument('--synthetic', action='store_true',
+                        help="simulate on generated data instead of the database")
+    parser.add_argument('--budget', type=int, default=DAILY_REQUEST_BUDGET)
+    parser.add_argument('--db', default="flight_data.db")
+    parser.add_argument('--departure-days', type=float,
+                        help="one departure this many days after the replay starts")
+    parser.add_argument('--staggered-departures', action='store_true',
+                        help="a different departure date per route (synthetic data)")
+    args = parser.parse_args()
+
+    if args.simulate:
+        if args.synthetic:
+            histories = synthetic_histories()
+        else:
+            from database import FlightDatabase
+            histories = load_histories(FlightDatabase(args.db))
+        departures: Departures = None
+        if args.staggered_departures and histories:
+            departures = synthetic_departures(histories)
+        elif args.departure_days is not None and histories:
+            first = min(samples[0][0] for samples in histories.values() if samples)
+            departures = first + args.departure_days * 86400
+        scores = simulate(histories, args.budget, departures)
+        if not scores:
+            print("No price history to replay.")
+        for policy, score in scores.items():
+            print(f"{policy:12s} {score}")
+    elif SCHEDULER_MODE == 'adaptive':
+        run_adaptive_scheduler()
+    else:
+        logging.info("Scheduler started")
+        while True:
+            schedule.run_pending()
+            time.sleep(60)  # Check every minute